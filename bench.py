@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""Benchmarks for the heading-detection pipeline. Run `python bench.py <command> -h` for options."""
+import argparse, json, platform, random, resource, sys, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pdfplumber
+from metrics import Metrics
+from processor import (EXTRACTORS, assign_levels, candidate_rows, detect_title, drop_repeating_headers,
+                       merge_wrapped_heading_lines, process_pdf, score_lines)
+from structures import LineTable, PageGeometry
+from synthpdf import generate_corpus
+
+BASELINE = Path(__file__).resolve().parent / "bench_baseline.json"
+# suite metric -> True when higher is better; compared against the baseline by check_regressions
+SUITE_CHECKS = {"pages_per_sec": True, "lines_per_sec": True, "p50_ms": False, "p95_ms": False,
+                "peak_rss_mb": False}
+# suite metric -> power of the calibration ratio (current / baseline machine) its baseline value is scaled by
+SPEED_SCALED = {"pages_per_sec": -1, "lines_per_sec": -1, "p50_ms": 1, "p95_ms": 1}
+
+
+def bench_extractors(pdfs, repeat=1):
+    """Time each line extractor over the given PDFs. Returns {extractor: stats dict}."""
+    results = {}
+    for name, extract in EXTRACTORS.items():
+        pages = lines = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for path in pdfs:
+                with pdfplumber.open(path) as pdf:
+                    for p_idx, page in enumerate(pdf.pages, start=1):
+                        lines += sum(1 for _ in extract(page, p_idx)[1])
+                        page.close()
+                        pages += 1
+        seconds = time.perf_counter() - start
+        results[name] = {"pages": pages, "lines": lines, "seconds": seconds,
+                         "pages_per_sec": pages / seconds if seconds else 0.0}
+    return results
+
+
+def synthetic_candidates(n, seed=0):
+    """LineTable of n heading candidates in three font sizes, H3-heavy with H2s rare early on.
+
+    That mix is the worst case for the old prefix scan that demoted isolated H3s."""
+    rng = random.Random(seed)
+    table = LineTable()
+    for i in range(n):
+        size = rng.choices([20.0, 16.0, 12.0], weights=[1, 1 if i > n // 2 else 0.01, 8])[0]
+        table.append({"page": 1 + i // 40, "text": f"Heading {i}", "font_name": "Helvetica-Bold",
+                      "x0": 72.0, "x1": 300.0, "top": 72.0 + (i % 40) * 18, "bottom": 86.0 + (i % 40) * 18,
+                      "is_boldish": True, "is_all_caps": False, "avg_font_size": size,
+                      "leading": 6.0, "indent": 0.0})
+    return table
+
+
+def bench_levels(n, repeat=3):
+    """Best-of-repeat seconds for assign_levels over n synthetic candidates."""
+    cands = synthetic_candidates(n)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outline = assign_levels(cands)
+        best = min(best, time.perf_counter() - start)
+    return {"candidates": n, "outline": len(outline), "seconds": best}
+
+
+def synthetic_lines(n, seed=0, wrap_rate=0.05):
+    """LineTable of n body lines, with a two-line bold heading in place of roughly wrap_rate of them."""
+    rng = random.Random(seed)
+    table = LineTable()
+    i = 0
+    while i < n:
+        page, y = 1 + i // 50, 72.0 + (i % 50) * 14
+        if rng.random() < wrap_rate and i % 50 < 49 and i + 1 < n:
+            for part in ("Heading that wraps", "onto a second line"):
+                table.append({"page": page, "text": part, "font_name": "Helvetica-Bold",
+                              "x0": 72.0, "x1": 260.0, "top": y, "bottom": y + 12.0,
+                              "is_boldish": True, "is_all_caps": False, "avg_font_size": 14.0,
+                              "leading": 2.0, "indent": 0.0})
+                y += 14.0
+            i += 2
+            continue
+        table.append({"page": page, "text": "body text " * 6, "font_name": "Times-Roman",
+                      "x0": 72.0, "x1": 540.0, "top": y, "bottom": y + 10.0,
+                      "is_boldish": False, "is_all_caps": False, "avg_font_size": 10.0,
+                      "leading": 4.0, "indent": 0.0})
+        i += 1
+    return table
+
+
+def bench_merge(n, repeat=3):
+    """Best-of-repeat seconds for merge_wrapped_heading_lines over n synthetic lines."""
+    best, merged = float("inf"), 0
+    for seed in range(repeat):
+        lines = synthetic_lines(n, seed)
+        start = time.perf_counter()
+        merged = len(merge_wrapped_heading_lines(lines))
+        best = min(best, time.perf_counter() - start)
+    return {"lines": n, "merged": merged, "seconds": best}
+
+
+# synthetic_table line kinds: body, H1, H2, H3, running header, running footer
+KIND_SIZE = np.array([10.0, 20.0, 16.0, 13.0, 8.0, 8.0])
+KIND_BOLD = np.array([0, 1, 1, 1, 0, 0], dtype=np.int8)
+KIND_FONT = np.array([0, 1, 1, 1, 2, 2], dtype=np.int32)
+TABLE_FONTS = ["Times-Roman", "Helvetica-Bold", "Helvetica"]
+TEXT_POOL = 1000  # distinct strings per kind; lines share them so 10^7-line tables stay affordable
+STAGES = ("headers", "merge", "score", "threshold", "title", "levels")
+
+
+def synthetic_table(n, seed=0, heading_rate=0.05, level_weights=(1, 3, 6), wrap_rate=0.2, lines_per_page=50,
+                    running_header=True):
+    """LineTable of n extracted-looking lines, built column-wise with numpy, for benchmarking the stages after extraction.
+
+    heading_rate is the share of lines that are headings, split over H1/H2/H3
+    sizes by level_weights; wrap_rate the share of headings continued on a
+    second line (merge_wrapped_heading_lines input). With running_header the
+    first and last line of every page are a repeating header and page footer."""
+    rng = np.random.default_rng(seed)
+    w = np.array(level_weights, dtype=float) / sum(level_weights)
+    kind = rng.choice(4, size=n, p=[1 - heading_rate, *(heading_rate * w)])
+    slot = np.arange(n) % lines_per_page
+    heading = np.flatnonzero((kind > 0) & (slot < lines_per_page - 2) & (rng.random(n) < wrap_rate))
+    kind[heading + 1] = kind[heading]
+    continued = np.zeros(n, dtype=bool)
+    continued[heading + 1] = True
+    if running_header:
+        kind[slot == 0] = 4
+        kind[slot == lines_per_page - 1] = 5
+    size = KIND_SIZE[kind]
+    # Flow lines down each page, headers and footers aside, with extra space above headings
+    advance = np.where(kind >= 4, 0.0, size * 1.25)
+    advance[:-1] += np.where((kind[1:] > 0) & (kind[1:] < 4) & ~continued[1:], 8.0, 0.0)
+    flow = np.cumsum(advance) - advance
+    top = 72.0 + flow - flow[(np.arange(n) // lines_per_page) * lines_per_page]
+    top[kind == 4] = 30.0
+    top[kind == 5] = 760.0
+    bottom = top + size
+    leading = np.maximum(top - np.concatenate(([0.0], bottom[:-1])), 0.0)
+    leading[slot == 0] = 0.0
+
+    text_rng = random.Random(seed)
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt".split()
+    pools = [[" ".join(text_rng.choices(words, k=text_rng.randint(8, 14))) for _ in range(TEXT_POOL)]]
+    for level in (1, 2, 3):
+        pools.append([f"{'.'.join(str(text_rng.randint(1, 9)) for _ in range(level))} "
+                      f"{' '.join(text_rng.choices(words, k=3)).title()}" for _ in range(TEXT_POOL)])
+    pools.append(["Synthetic Corp Annual Report"] * TEXT_POOL)
+    pools.append([f"Page {i + 1}" for i in range(TEXT_POOL)])
+    pick = rng.integers(0, TEXT_POOL, size=n)
+    pick[kind == 5] = (np.arange(n)[kind == 5] // lines_per_page) % TEXT_POOL
+    text = [pools[k][j] for k, j in zip(kind.tolist(), pick.tolist())]
+    x0 = np.where(kind == 5, 290.0, 72.0)
+    x1 = x0 + np.array([len(t) for t in text]) * size * 0.5
+
+    table = LineTable(TABLE_FONTS)
+    table.text = text
+    columns = {"page": np.arange(n) // lines_per_page + 1, "font_id": KIND_FONT[kind], "is_boldish": KIND_BOLD[kind],
+               "is_all_caps": np.zeros(n), "x0": x0, "x1": x1, "top": top, "bottom": bottom,
+               "avg_font_size": size, "leading": leading, "indent": np.zeros(n), "score": np.zeros(n)}
+    for name, values in columns.items():
+        col = getattr(table, name)
+        col.frombytes(np.ascontiguousarray(values, dtype=np.dtype(col.typecode)).tobytes())
+    for p in range(1, (n - 1) // lines_per_page + 2):
+        table.pages[p] = PageGeometry(p, 612.0, 792.0, 72.0, 540.0, [72.0])
+    return table
+
+
+def time_stages(lines):
+    """Run the post-extraction stages in pipeline order on a LineTable; returns {stage: seconds}."""
+    times = {}
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        out = fn(*args)
+        times[name] = time.perf_counter() - start
+        return out
+    lines = timed("headers", drop_repeating_headers, lines)
+    lines = timed("merge", merge_wrapped_heading_lines, lines)
+    scored = timed("score", score_lines, lines)
+    start = time.perf_counter()
+    cands = scored.take(candidate_rows(scored).tolist())
+    times["threshold"] = time.perf_counter() - start
+    timed("title", detect_title, {}, scored, cands)
+    timed("levels", assign_levels, cands)
+    return times
+
+
+def bench_scaling(sizes, repeat=3, budget=30.0, **workload):
+    """Per-stage seconds at each table size (best of repeat below 10^6 lines, one run above).
+
+    Once the whole pipeline takes longer than budget seconds at some size,
+    larger sizes are not attempted. Returns {size: {stage: seconds}}."""
+    results = {}
+    for n in sizes:
+        best = {}
+        for _ in range(repeat if n < 10 ** 6 else 1):
+            times = time_stages(synthetic_table(n, **workload))
+            best = {k: min(v, best.get(k, v)) for k, v in times.items()}
+        results[n] = best
+        if sum(best.values()) > budget:
+            break
+    return results
+
+
+def scaling_slopes(results):
+    """Log-log slope of each stage's time against size over the measured sizes of at least 10^4 lines
+    (smaller ones are dominated by fixed costs): ~1 is linear, ~2 quadratic."""
+    sizes = [n for n in sorted(results) if n >= 10 ** 4] or sorted(results)
+    if len(sizes) < 2:
+        return {}
+    x = np.log10(sizes)
+    return {stage: float(np.polyfit(x, np.log10([max(results[n][stage], 1e-7) for n in sizes]), 1)[0])
+            for stage in STAGES}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB."""
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / (1 << 20 if sys.platform == "darwin" else 1 << 10)  # macOS reports bytes
+
+
+def calibration_ms(repeat=3):
+    """Fastest of repeat timings of a fixed pure-Python workload (string, dict and float work
+    independent of the pipeline), in ms: a yardstick of this machine's speed."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rng = random.Random(0)
+        counts = {}
+        for i in range(30_000):
+            word = " ".join(f"w{rng.randrange(2000)}" for _ in range(3)).split()[1]
+            counts[word] = counts.get(word, 0.0) + i * 0.5
+        sorted(counts.items())
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def _suite_document(path, extractor):
+    """(metrics dict, peak RSS, pdfplumber.open calls, calibration ms) for one process_pdf run;
+    meant for a fresh worker."""
+    opens = 0
+    real_open = pdfplumber.open
+
+    def counting_open(*args, **kwargs):
+        nonlocal opens
+        opens += 1
+        return real_open(*args, **kwargs)
+
+    metrics = Metrics()
+    pdfplumber.open = counting_open
+    try:
+        process_pdf(path, extractor=extractor, metrics=metrics)
+    finally:
+        pdfplumber.open = real_open
+    return metrics.as_dict(), peak_rss_mb(), opens, calibration_ms()
+
+
+def bench_suite(pdfs, repeat=3, extractor="words"):
+    """Run process_pdf on each PDF repeat times, each run in a fresh process so its peak RSS is its own.
+
+    Per document the fastest run counts. Returns a dict of corpus totals,
+    latency percentiles, peak RSS, summed per-stage times, the most times
+    any run opened its PDF (process_pdf should open each document once),
+    the fastest calibration_ms() of any run's worker (a best case, like the
+    per-document times) and per-document rows."""
+    docs = {}
+    calibrations = []
+    for path in pdfs:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                runs.append(pool.submit(_suite_document, path, extractor).result())
+        calibrations += [r[3] for r in runs]
+        metrics = min(runs, key=lambda r: r[0]["stages"]["process_pdf"]["wall_ms"])[0]
+        docs[path.stem] = {"ms": metrics["stages"]["process_pdf"]["wall_ms"], "pages": metrics["counts"]["pages"],
+                           "lines": metrics["counts"]["lines"], "peak_rss_mb": max(r[1] for r in runs),
+                           "opens": max(r[2] for r in runs),
+                           "stages": {k: v["wall_ms"] for k, v in metrics["stages"].items()}}
+    seconds = sum(d["ms"] for d in docs.values()) / 1000
+    latencies = [d["ms"] for d in docs.values()]
+    stages = {}
+    for d in docs.values():
+        for name, ms in d["stages"].items():
+            stages[name] = stages.get(name, 0.0) + ms
+    return {"documents": len(docs), "pages": sum(d["pages"] for d in docs.values()),
+            "lines": sum(d["lines"] for d in docs.values()), "seconds": seconds,
+            "pages_per_sec": sum(d["pages"] for d in docs.values()) / seconds,
+            "lines_per_sec": sum(d["lines"] for d in docs.values()) / seconds,
+            "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95)),
+            "peak_rss_mb": max(d["peak_rss_mb"] for d in docs.values()),
+            "max_opens": max(d["opens"] for d in docs.values()),
+            "calibration_ms": min(calibrations),
+            "stage_ms": stages, "per_document": docs}
+
+
+def check_regressions(result, baseline, tolerance):
+    """[(metric, baseline value, current value, relative change, regressed?)] for SUITE_CHECKS.
+
+    Timing baselines are first scaled by how much slower or faster this run's
+    calibration_ms was than the baseline's, so a baseline recorded on
+    another machine still compares like for like."""
+    speed = 1.0
+    if baseline.get("calibration_ms") and result.get("calibration_ms"):
+        speed = result["calibration_ms"] / baseline["calibration_ms"]
+    rows = []
+    for name, higher_is_better in SUITE_CHECKS.items():
+        base, cur = baseline[name] * speed ** SPEED_SCALED.get(name, 0), result[name]
+        change = (cur - base) / base if base else 0.0
+        worse = -change if higher_is_better else change
+        rows.append((name, base, cur, change, worse > tolerance))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks for processor.py")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ex = sub.add_parser("extractors", help="compare line extractors in pages/sec")
+    ex.add_argument("--input_dir", required=True)
+    ex.add_argument("--repeat", type=int, default=1)
+    lv = sub.add_parser("levels", help="time assign_levels on a synthetic outline")
+    lv.add_argument("--candidates", type=int, default=50_000)
+    su = sub.add_parser("suite", help="process_pdf over the synthetic corpus, checked against a stored baseline")
+    su.add_argument("--corpus-dir", help="where to generate the corpus (default: a temporary directory)")
+    su.add_argument("--repeat", type=int, default=3, help="runs per document; the fastest counts")
+    su.add_argument("--extractor", choices=sorted(EXTRACTORS), default="words")
+    su.add_argument("--baseline", default=str(BASELINE), help="baseline JSON to compare against (or write)")
+    su.add_argument("--save-baseline", action="store_true", help="store this run as the baseline instead of checking")
+    su.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown/growth counted as a regression")
+    su.add_argument("--report", help="write the full suite result to this JSON file")
+    sc = sub.add_parser("scaling", help="scaling curves of the post-extraction stages on synthetic line tables")
+    sc.add_argument("--sizes", default="1e3,1e4,1e5,1e6", help="comma-separated line counts, up to 1e7")
+    sc.add_argument("--heading-rate", type=float, default=0.05)
+    sc.add_argument("--wrap-rate", type=float, default=0.2)
+    sc.add_argument("--lines-per-page", type=int, default=50)
+    sc.add_argument("--budget", type=float, default=30.0, help="stop growing once one size takes this many seconds")
+    sc.add_argument("--repeat", type=int, default=3)
+    mg = sub.add_parser("merge", help="time merge_wrapped_heading_lines on synthetic lines")
+    mg.add_argument("--lines", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    if args.command == "levels":
+        r = bench_levels(args.candidates)
+        print(f"assign_levels {r['candidates']} candidates -> {r['outline']} entries in {r['seconds'] * 1000:.1f} ms")
+
+    if args.command == "suite":
+        with tempfile.TemporaryDirectory() as tmp:
+            pdfs = generate_corpus(args.corpus_dir or tmp)
+            r = bench_suite(pdfs, args.repeat, args.extractor)
+        print(f"{r['documents']} documents, {r['pages']} pages, {r['lines']} lines in {r['seconds']:.2f}s: "
+              f"{r['pages_per_sec']:.1f} pages/sec, {r['lines_per_sec']:.0f} lines/sec, "
+              f"p50 {r['p50_ms']:.0f} ms, p95 {r['p95_ms']:.0f} ms, peak RSS {r['peak_rss_mb']:.0f} MiB")
+        for name, ms in sorted(r["stage_ms"].items(), key=lambda kv: -kv[1]):
+            print(f"  {name:16s} {ms:10.1f} ms")
+        reopened = {name: d["opens"] for name, d in r["per_document"].items() if d["opens"] != 1}
+        if reopened:
+            print(f"REGRESSION: PDFs not opened exactly once: {reopened}")
+        if args.report:
+            Path(args.report).write_text(json.dumps(r, indent=2), encoding="utf-8")
+        if args.save_baseline:
+            r["machine"] = {"platform": platform.platform(), "python": platform.python_version(),
+                            "extractor": args.extractor, "repeat": args.repeat}
+            Path(args.baseline).write_text(json.dumps(r, indent=2) + "\n", encoding="utf-8")
+            print(f"Baseline written to {args.baseline}")
+        elif Path(args.baseline).exists():
+            baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+            if "calibration_ms" in baseline:
+                print(f"calibration {baseline['calibration_ms']:.1f} ms -> {r['calibration_ms']:.1f} ms "
+                      "(timing baselines scaled by the ratio)")
+            else:
+                print("baseline has no calibration_ms; timings compared unscaled (re-save it with --save-baseline)")
+            rows = check_regressions(r, baseline, args.tolerance)
+            for name, base, cur, change, bad in rows:
+                print(f"{name:14s} {base:12.1f} -> {cur:12.1f} {change:+7.1%}{'  REGRESSION' if bad else ''}")
+            if any(bad for *_, bad in rows):
+                sys.exit(1)
+        if reopened:
+            sys.exit(1)
+
+    if args.command == "scaling":
+        sizes = sorted(int(float(s)) for s in args.sizes.split(","))
+        results = bench_scaling(sizes, args.repeat, args.budget, heading_rate=args.heading_rate,
+                                wrap_rate=args.wrap_rate, lines_per_page=args.lines_per_page)
+        slopes = scaling_slopes(results)
+        measured = sorted(results)
+        print(f"{'stage':10s}" + "".join(f"{n:>12,d}" for n in measured) + "   slope")
+        for stage in STAGES:
+            slope = slopes.get(stage)
+            flag = "  SUPERLINEAR" if slope is not None and slope > 1.25 else ""
+            print(f"{stage:10s}" + "".join(f"{results[n][stage] * 1000:10.1f}ms" for n in measured)
+                  + (f"   {slope:5.2f}{flag}" if slope is not None else ""))
+        if len(measured) < len(sizes):
+            print(f"stopped before {sizes[len(measured)]:,d} lines: over the {args.budget:.0f}s budget")
+
+    if args.command == "merge":
+        r = bench_merge(args.lines)
+        print(f"merge_wrapped_heading_lines {r['lines']} lines -> {r['merged']} in {r['seconds'] * 1000:.1f} ms "
+              f"({r['lines'] / r['seconds'] / 1e6:.2f} M lines/sec)")
+
+    if args.command == "extractors":
+        pdfs = sorted(p for p in Path(args.input_dir).iterdir() if p.suffix.lower() == ".pdf")
+        if not pdfs:
+            print("No PDFs found in input_dir", file=sys.stderr)
+            return
+        for name, r in bench_extractors(pdfs, args.repeat).items():
+            print(f"{name:8s} {r['pages']:6d} pages {r['lines']:8d} lines "
+                  f"{r['seconds']:8.2f}s {r['pages_per_sec']:8.1f} pages/sec")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import hashlib, io, json, os, zipfile
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+from fileio import atomic_write
+from structures import LineTable
+
+# Source files whose contents define the pipeline's behaviour; editing any of
+# them changes pipeline_version() and so invalidates every cached result
+PIPELINE_FILES = ("processor.py", "scoring.py", "structures.py", "thresholds.py")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def pipeline_version():
+    """Short hash of the pipeline's heuristic source files."""
+    h = hashlib.sha256()
+    here = Path(__file__).resolve().parent
+    for name in PIPELINE_FILES:
+        h.update(name.encode())
+        h.update((here / name).read_bytes())
+    return h.hexdigest()[:16]
+
+
+class ResultCache:
+    """On-disk cache of process_pdf results keyed by PDF content hash, pipeline version and options.
+
+    Entries are small JSON files written atomically, so several worker
+    processes can share one cache_dir. Reads refresh an entry's mtime and
+    eviction removes the least recently used entries once the directory
+    grows past max_bytes."""
+
+    suffix = ".json"
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._size = None  # bytes on disk as last scanned plus our own writes since
+
+    def key(self, pdf_path, **options):
+        """Cache key for a PDF processed with the given (JSON-serialisable) options."""
+        h = hashlib.sha256()
+        h.update(file_sha256(pdf_path).encode())
+        h.update(pipeline_version().encode())
+        h.update(json.dumps(options, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / (key + self.suffix)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with path.open(encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return result
+
+    def put(self, key, result):
+        self._write(key, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+    def _write(self, key, data):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for path in self.cache_dir.glob("*/*" + self.suffix):
+            try:
+                st = path.stat()
+            except FileNotFoundError:  # evicted by another process
+                continue
+            yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache is under 90% of max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._size = total
+
+
+class FeatureCache(ResultCache):
+    """On-disk cache of extracted LineTables (plus the PDF metadata) as .npz files.
+
+    Keyed by PDF content hash and the extractor name and version only, so
+    entries survive edits to the scoring and levelling heuristics; re-running
+    those stages from cached features skips pdfminer entirely."""
+
+    suffix = ".npz"
+
+    def key(self, pdf_path, **options):
+        h = hashlib.sha256()
+        h.update(file_sha256(pdf_path).encode())
+        h.update(json.dumps(options, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        """(metadata dict, LineTable) stored under key, or None."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                metadata = json.loads(str(npz["metadata"]))
+                lines = LineTable.from_arrays(npz)
+            os.utime(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        return metadata, lines
+
+    def put(self, key, metadata, lines):
+        buf = io.BytesIO()
+        np.savez(buf, metadata=np.array(json.dumps(metadata, default=str)), **lines.to_arrays())
+        self._write(key, buf.getvalue())
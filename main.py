@@ -1,33 +1,263 @@
 #!/usr/bin/env python3
-import argparse, json, sys
+import argparse, json, os, signal, sys
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from processor import process_pdf
+from cache import FeatureCache, ResultCache
+from fileio import atomic_write
+from manifest import Manifest, run_fingerprint
+from metrics import MemoryMetrics, Metrics
+from processor import EXTRACTORS, process_pdf
+from sampler import StackSampler, format_folded, merge_stacks
+from scoring import ScoringModel
+from thresholds import STRATEGIES
+from watch import watch_pdfs
+
+EMPTY_RESULT = {"title": None, "outline": []}
+
+
+def run_one(pdf_path, instrument=False, mem_profile=False, sample_hz=0, **options):
+    """Process one PDF, never raising; returns (result, error message or None, stats dict).
+
+    stats is Metrics.as_dict() with instrument, plus a "memory" section with
+    mem_profile (see metrics.MemoryMetrics) and a "profile" section of
+    folded stacks with sample_hz (see sampler.StackSampler), otherwise empty."""
+    metrics = MemoryMetrics() if mem_profile else Metrics() if instrument else None
+    sampler = StackSampler(process_pdf, sample_hz) if sample_hz else None
+    try:
+        with sampler or nullcontext():
+            result, err = process_pdf(pdf_path, metrics=metrics, **options), None
+    except Exception as e:
+        result, err = EMPTY_RESULT, str(e)
+    finally:
+        if mem_profile:
+            metrics.stop()
+    stats = metrics.as_dict() if metrics else {}
+    if sampler:
+        stats["profile"] = sampler.as_dict()
+    return result, err, stats
+
+
+def format_stats(stats):
+    counts = " ".join(f"{k}={v}" for k, v in sorted(stats.get("counts", {}).items()))
+    total = stats.get("stages", {}).get("process_pdf")
+    if total:
+        counts += f" ms={total['wall_ms']:.1f}"
+    if "memory" in stats:
+        counts += f" peak_mb={stats['memory']['peak_bytes'] / 2**20:.1f}"
+    if "profile" in stats:
+        counts += f" samples={stats['profile']['samples']} overhead={stats['profile']['overhead_pct']:.2f}%"
+    return counts
+
+
+def write_metrics(f, pdf_path, err, stats):
+    """Append one NDJSON record of a document's stage timings and counts."""
+    f.write(json.dumps({"file": pdf_path.name, "error": err, **stats}, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+def write_result(out_dir, pdf_path, result, suffix=".json"):
+    """Write result as JSON to <stem><suffix> atomically, so readers never see a partial file."""
+    atomic_write(out_dir / (pdf_path.stem + suffix), json.dumps(result, ensure_ascii=False, indent=2))
+
+
+def finish(out_dir, pdf_path, result, err, stats=None, verbose=False, metrics_out=None, profile=None):
+    """Write a document's outputs; its sampled stacks are also added to the batch total profile if given."""
+    if verbose: print(f"Processed {pdf_path.name} {format_stats(stats or {})}", file=sys.stderr)
+    if err: print(f"ERROR processing {pdf_path.name}: {err}", file=sys.stderr)
+    write_result(out_dir, pdf_path, result)
+    if stats and "memory" in stats:
+        write_result(out_dir, pdf_path, {"file": pdf_path.name, **stats["memory"]}, ".mem.json")
+    if stats and "profile" in stats:
+        stacks = stats["profile"].pop("stacks")  # kept out of the metrics NDJSON
+        atomic_write(out_dir / (pdf_path.stem + ".folded"), format_folded(stacks))
+        if profile is not None:
+            merge_stacks(profile, stacks)
+    if metrics_out is not None:
+        write_metrics(metrics_out, pdf_path, err, stats or {})
+
+
+def run_alone(pdf_path, options):
+    """Run one PDF in a fresh single-worker pool; used after a crash broke the shared pool."""
+    try:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            return pool.submit(run_one, pdf_path, **options).result()
+    except BrokenProcessPool as e:
+        return EMPTY_RESULT, f"worker crashed: {e}", {}
+
+
+def warm_pool(workers, mp_context=None):
+    """A process pool whose workers are already started (and have imported the pipeline).
+
+    mp_context is a multiprocessing context, the platform's default start method when None."""
+    # workers ignore Ctrl-C so an interrupt drains in-flight files instead of killing them
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=signal.signal,
+                               initargs=(signal.SIGINT, signal.SIG_IGN))
+    for fut in [pool.submit(os.getpid) for _ in range(workers)]:
+        fut.result()
+    return pool
+
+
+def watch(in_dir, out_dir, options, workers=1, interval=1.0, poll=False, verbose=False, metrics_out=None,
+          profile=None):
+    """Process PDFs as they land in in_dir until SIGINT/SIGTERM, then drain in-flight work."""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    pool = warm_pool(max(workers, 1))
+    pending = {}  # future -> pdf path
+    if verbose: print(f"Watching {in_dir}", file=sys.stderr)
+
+    def reap(wait=False):
+        nonlocal pool
+        broken = []
+        for fut in [f for f in pending if wait or f.done()]:
+            pdf_path = pending.pop(fut)
+            try:
+                finish(out_dir, pdf_path, *fut.result(), verbose=verbose, metrics_out=metrics_out, profile=profile)
+            except BrokenProcessPool:
+                broken.append(pdf_path)
+        if broken:
+            pool.shutdown(wait=False, cancel_futures=True)
+            for pdf_path in broken + list(pending.values()):
+                finish(out_dir, pdf_path, *run_alone(pdf_path, options), verbose=verbose, metrics_out=metrics_out,
+                       profile=profile)
+            pending.clear()
+            pool = warm_pool(max(workers, 1))
+
+    try:
+        for pdf_path in watch_pdfs(in_dir, interval, poll):
+            if pdf_path is not None:
+                pending[pool.submit(run_one, pdf_path, **options)] = pdf_path
+            reap()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        reap(wait=True)
+        pool.shutdown()
+
+
+def add_pipeline_args(ap):
+    """Arguments controlling process_pdf, shared by main.py and server.py."""
+    ap.add_argument("--page-workers", type=int, default=1,
+                    help="processes used to extract pages of a single large PDF (1 = serial)")
+    ap.add_argument("--use-bookmarks", action="store_true",
+                    help="take the outline from the PDF's bookmarks when it has them")
+    ap.add_argument("--scoring-model", help="JSON file of heading-score weights (see scoring.py)")
+    ap.add_argument("--extractor", choices=sorted(EXTRACTORS), default="words",
+                    help="line extractor: pdfplumber words (default) or raw chars")
+    ap.add_argument("--threshold", choices=STRATEGIES, default="mean_std",
+                    help="heading candidate cut-off: mean + k*stdev, top percentile or Otsu split")
+    ap.add_argument("--threshold-k", type=float, default=1.0, help="k for --threshold mean_std")
+    ap.add_argument("--threshold-top", type=float, default=0.1, help="fraction kept by --threshold percentile")
+    ap.add_argument("--cache-dir", help="directory for cached results keyed by PDF content hash")
+    ap.add_argument("--feature-cache-dir",
+                    help="directory for extracted line features, reused when only later stages change")
+    ap.add_argument("--cache-max-mb", type=int, default=1024,
+                    help="size bound of each of --cache-dir and --feature-cache-dir (LRU eviction)")
+
+
+def pipeline_options(args):
+    """process_pdf keyword arguments from the add_pipeline_args arguments."""
+    model = ScoringModel.from_json(args.scoring_model) if args.scoring_model else None
+    return dict(page_workers=args.page_workers, use_bookmarks=args.use_bookmarks, model=model,
+                extractor=args.extractor,
+                threshold=dict(strategy=args.threshold, k=args.threshold_k, top=args.threshold_top),
+                cache=ResultCache(args.cache_dir, args.cache_max_mb << 20) if args.cache_dir else None,
+                feature_cache=(FeatureCache(args.feature_cache_dir, args.cache_max_mb << 20)
+                               if args.feature_cache_dir else None))
+
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--input_dir", required=True)
     ap.add_argument("--output_dir", required=True)
+    ap.add_argument("--workers", type=int, default=1, help="number of worker processes (1 = serial)")
+    add_pipeline_args(ap)
+    ap.add_argument("--incremental", action="store_true",
+                    help="skip PDFs unchanged since the last run and remove outputs of deleted ones "
+                         "(tracked in output_dir/.manifest.json)")
+    ap.add_argument("--watch", action="store_true",
+                    help="stay resident and process PDFs as they land in input_dir")
+    ap.add_argument("--watch-interval", type=float, default=1.0, help="seconds between polls/idle checks")
+    ap.add_argument("--poll", action="store_true", help="with --watch, poll instead of using inotify")
+    ap.add_argument("--metrics-out", help="append per-document stage timings and counts to this NDJSON file")
+    ap.add_argument("--mem-profile", action="store_true",
+                    help="trace allocations per stage with tracemalloc and write <stem>.mem.json next to each output")
+    ap.add_argument("--sample-profile", action="store_true",
+                    help="sample process_pdf's stacks on SIGPROF and write <stem>.folded (flamegraph input) "
+                         "next to each output")
+    ap.add_argument("--sample-hz", type=int, default=100, help="samples per CPU second with --sample-profile")
+    ap.add_argument("--profile-out",
+                    help="with --sample-profile, write the batch's folded stacks summed over documents to this file")
     ap.add_argument("--verbose", action="store_true")
     args = ap.parse_args()
+    if args.watch and args.incremental:
+        ap.error("--incremental does not apply to --watch")
+    if args.sample_profile and not hasattr(signal, "setitimer"):
+        ap.error("--sample-profile needs signal.setitimer, which this platform lacks")
+    if args.sample_hz <= 0:
+        ap.error("--sample-hz must be positive")
 
+    options = pipeline_options(args)
+    options["instrument"] = bool(args.metrics_out or args.verbose)
+    options["mem_profile"] = args.mem_profile
+    options["sample_hz"] = args.sample_hz if args.sample_profile else 0
+    profile = {} if args.sample_profile and args.profile_out else None
     in_dir = Path(args.input_dir)
     out_dir = Path(args.output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    pdfs = sorted(p for p in in_dir.iterdir() if p.suffix.lower() == ".pdf")
-    if not pdfs:
-        print("No PDFs found in input_dir", file=sys.stderr)
-
-    for pdf_path in pdfs:
-        if args.verbose: print(f"Processing {pdf_path.name}...", file=sys.stderr)
+    with open(args.metrics_out, "a", encoding="utf-8") if args.metrics_out else nullcontext() as metrics_out:
         try:
-            result = process_pdf(pdf_path)
-        except Exception as e:
-            print(f"ERROR processing {pdf_path.name}: {e}", file=sys.stderr)
-            result = {"title": None, "outline": []}
-        out_path = out_dir / (pdf_path.stem + ".json")
-        with out_path.open("w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+            if args.watch:
+                watch(in_dir, out_dir, options, args.workers, args.watch_interval, args.poll, args.verbose,
+                      metrics_out, profile)
+                return
+            pdfs = sorted(p for p in in_dir.iterdir() if p.suffix.lower() == ".pdf")
+            if not pdfs:
+                print("No PDFs found in input_dir", file=sys.stderr)
+
+            manifest = None
+            if args.incremental:
+                manifest = Manifest(out_dir, run_fingerprint(options))
+                pdfs, skipped, removed = manifest.plan(pdfs)
+                if args.verbose:
+                    print(f"{len(pdfs)} to process, {skipped} unchanged, {len(removed)} removed", file=sys.stderr)
+            try:
+                run_batch(pdfs, out_dir, options, args.workers, manifest, args.verbose, metrics_out, profile)
+            finally:
+                if manifest is not None:
+                    manifest.save()
+        finally:
+            if profile is not None:
+                atomic_write(args.profile_out, format_folded(profile))
+
+
+def run_batch(pdfs, out_dir, options, workers=1, manifest=None, verbose=False, metrics_out=None, profile=None):
+    """Process pdfs into out_dir, recording successes in manifest when given."""
+    def done(pdf_path, result, err, stats=None):
+        finish(out_dir, pdf_path, result, err, stats, verbose, metrics_out, profile)
+        if manifest is not None and not err:
+            manifest.record(pdf_path)
+
+    if workers <= 1:
+        for pdf_path in pdfs:
+            done(pdf_path, *run_one(pdf_path, **options))
+        return
+
+    # A hard crash in one worker (e.g. a segfault in a C extension) breaks the
+    # whole pool; every file caught in it is retried alone in a fresh process
+    # so only the offending PDF ends up with an empty result.
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_one, p, **options): p for p in pdfs}
+        for fut in as_completed(futures):
+            try:
+                done(futures[fut], *fut.result())
+            except BrokenProcessPool:
+                broken.append(futures[fut])
+    for pdf_path in sorted(broken):
+        done(pdf_path, *run_alone(pdf_path, options))
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,86 @@
+import hashlib, json, time
+from pathlib import Path
+from cache import file_sha256, pipeline_version
+from fileio import atomic_write
+from processor import output_options
+
+MANIFEST_NAME = ".manifest.json"
+SAVE_INTERVAL = 30  # seconds between checkpoints of the manifest during a run
+
+
+def run_fingerprint(options):
+    """Short hash of the pipeline version and the process_pdf options that shape its output."""
+    h = hashlib.sha256(pipeline_version().encode())
+    h.update(json.dumps(output_options(**options), sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+class Manifest:
+    """Record of the inputs whose output in out_dir is current, for incremental runs.
+
+    Entries map an input file name to [size, mtime_ns, sha256, fingerprint].
+    An input is skipped when its size and mtime are unchanged, or when they
+    changed but its content hash did not; either way only if it was
+    processed under the same fingerprint and its output still exists. Only
+    successfully processed files are recorded, so failures are retried."""
+
+    def __init__(self, out_dir, fingerprint):
+        self.out_dir = Path(out_dir)
+        self.path = self.out_dir / MANIFEST_NAME
+        self.fingerprint = fingerprint
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))["entries"]
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+        self._stats = {}  # name -> (size, mtime_ns) seen by plan(), recorded on success
+        self._saved = time.monotonic()
+
+    def _output(self, name):
+        return self.out_dir / (Path(name).stem + ".json")
+
+    def plan(self, pdfs):
+        """Sort pdfs into those needing processing and unchanged ones, and drop the
+        entries and outputs of inputs that no longer exist.
+
+        Returns (pdfs to process, count skipped, names removed)."""
+        todo, skipped = [], 0
+        present = set()
+        for pdf_path in pdfs:
+            name = pdf_path.name
+            present.add(name)
+            st = pdf_path.stat()
+            stat = (st.st_size, st.st_mtime_ns)
+            self._stats[name] = stat
+            entry = self.entries.get(name)
+            if entry is None or entry[3] != self.fingerprint or not self._output(name).exists():
+                todo.append(pdf_path)
+            elif tuple(entry[:2]) == stat:
+                skipped += 1
+            elif entry[2] == file_sha256(pdf_path):  # touched or copied over, content unchanged
+                entry[:2] = stat
+                skipped += 1
+            else:
+                todo.append(pdf_path)
+        removed = [name for name in self.entries if name not in present]
+        for name in removed:
+            self._output(name).unlink(missing_ok=True)
+            self._output(name).with_suffix(".mem.json").unlink(missing_ok=True)
+            self._output(name).with_suffix(".folded").unlink(missing_ok=True)
+            del self.entries[name]
+        return todo, skipped, removed
+
+    def record(self, pdf_path):
+        """Mark pdf_path's output as current; checkpoints the manifest every SAVE_INTERVAL seconds."""
+        name = pdf_path.name
+        stat = self._stats.get(name)
+        if stat is None:
+            st = pdf_path.stat()
+            stat = (st.st_size, st.st_mtime_ns)
+        self.entries[name] = [*stat, file_sha256(pdf_path), self.fingerprint]
+        if time.monotonic() - self._saved > SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        data = json.dumps({"fields": ["size", "mtime_ns", "sha256", "fingerprint"], "entries": self.entries})
+        atomic_write(self.path, data)
+        self._saved = time.monotonic()
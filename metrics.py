@@ -0,0 +1,155 @@
+import time, tracemalloc
+from contextlib import nullcontext
+
+
+class Metrics:
+    """Per-document stage timings and item counts collected by process_pdf.
+
+    stage(name) times a block in wall and CPU seconds, accumulating over
+    repeated entries (e.g. once per page); count(name, n) adds to a counter.
+    Stages may nest, so the top-level "process_pdf" stage covers the rest."""
+
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}  # name -> [wall seconds, cpu seconds, calls]
+        self.counts = {}
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def merge(self, other):
+        """Add another Metrics' (or its as_dict()'s) stages and counts, e.g. from a page shard worker."""
+        if isinstance(other, Metrics):
+            other = other.as_dict()
+        for name, s in other["stages"].items():
+            acc = self.stages.setdefault(name, [0.0, 0.0, 0])
+            acc[0] += s["wall_ms"] / 1000
+            acc[1] += s["cpu_ms"] / 1000
+            acc[2] += s["calls"]
+        for name, n in other["counts"].items():
+            self.count(name, n)
+
+    def as_dict(self):
+        return {"stages": {name: {"wall_ms": round(wall * 1000, 3), "cpu_ms": round(cpu * 1000, 3), "calls": calls}
+                           for name, (wall, cpu, calls) in self.stages.items()},
+                "counts": dict(self.counts)}
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "wall", "cpu")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def __exit__(self, *exc):
+        acc = self.metrics.stages.get(self.name)
+        if acc is None:
+            acc = self.metrics.stages[self.name] = [0.0, 0.0, 0]
+        acc[0] += time.perf_counter() - self.wall
+        acc[1] += time.process_time() - self.cpu
+        acc[2] += 1
+
+
+class MemoryMetrics(Metrics):
+    """Metrics that also trace allocations with tracemalloc (started here if it is not running).
+
+    For every stage it records the peak traced memory above the level at
+    entry and the bytes still held at exit, each the largest over the
+    stage's calls. Whenever a stage ends having set a new high for the
+    document a snapshot is taken, and the top sites of the last one are
+    reported: what was still live when the peak stage ended, which misses
+    short-lived allocations that the stage freed before returning. Only
+    this process is traced, not page-shard workers."""
+
+    def __init__(self, top=10, frames=1):
+        super().__init__()
+        self.memory = {}  # name -> [peak bytes above entry, retained bytes, calls]
+        self.top = top
+        self.peak = 0
+        self._snapshot = None
+        self._open = []  # [traced bytes at entry, highest peak seen] per open stage, innermost last
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start(frames)
+
+    def stage(self, name):
+        return _MemoryStage(self, name)
+
+    def stop(self):
+        """Stop tracemalloc if this object started it."""
+        if self._started and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def top_sites(self):
+        """[{site, size_bytes, count}] of the largest allocation sites still live at the end of the peak stage."""
+        if self._snapshot is None:
+            return []
+        snapshot = self._snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        return [{"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "size_bytes": s.size,
+                 "count": s.count} for s in snapshot.statistics("lineno")[:self.top]]
+
+    def as_dict(self):
+        d = super().as_dict()
+        d["memory"] = {"peak_bytes": self.peak,
+                       "stages": {name: {"peak_bytes": peak, "retained_bytes": retained, "calls": calls}
+                                  for name, (peak, retained, calls) in self.memory.items()},
+                       "retained_at_peak_stage_exit": self.top_sites()}
+        return d
+
+
+class _MemoryStage(_Stage):
+    __slots__ = ()
+
+    def __enter__(self):
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self.metrics._open:  # the reset below would otherwise lose the outer stages' peak
+            frame[1] = max(frame[1], peak)
+        tracemalloc.reset_peak()
+        self.metrics._open.append([current, current])
+        super().__enter__()
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        m = self.metrics
+        current, peak = tracemalloc.get_traced_memory()
+        entry, seen = m._open.pop()
+        peak = max(peak, seen)
+        for frame in m._open:
+            frame[1] = max(frame[1], peak)
+        acc = m.memory.get(self.name)
+        if acc is None:
+            acc = m.memory[self.name] = [0, 0, 0]
+        acc[0] = max(acc[0], peak - entry)
+        acc[1] = max(acc[1], current - entry)
+        acc[2] += 1
+        if peak > m.peak:
+            m.peak = peak
+            m._snapshot = tracemalloc.take_snapshot()  # grouped into sites only once, in top_sites()
+
+
+class NullMetrics:
+    """Stand-in used when instrumentation is off: every call is a no-op on shared objects."""
+
+    enabled = False
+    _stage = nullcontext()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, name, n=1):
+        pass
+
+    def merge(self, other):
+        pass
+
+
+NULL_METRICS = NullMetrics()
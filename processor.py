@@ -1,36 +1,268 @@
-import pdfplumber, statistics, re
+import bisect, math, pdfplumber, statistics, re
+import numpy as np
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from metrics import NULL_METRICS, Metrics
 from pathlib import Path
+from pdfminer.layout import LTChar, LTContainer
+from pdfminer.pdftypes import PDFObjRef, resolve1
+from pdfminer.psparser import PSLiteral
+from pdfminer.utils import decode_text
+from scoring import FEATURES, ScoringModel
+from structures import LineTable, PageGeometry
+from thresholds import ScoreSketch, compute_threshold, select_candidates
 
 NUM_PAT = re.compile(r"^(?P<num>([0-9]+(\.[0-9]+)*|[IVXLCDM]+|第[一二三四五六七八九十百千]+章))\\b")
 HEADER_TOL_Y = 10  # px tolerance for header/footer repeat detection
+HEADER_MIN_FRACTION = 0.5  # share of pages a header/footer must repeat on
+HEADER_ZONE = 0.15  # headers/footers live in this top/bottom share of the page
+DIGIT_RUN = re.compile(r"\d+")
+WRAP_MAX_GAP = 0.6  # max gap between the lines of a wrapped heading, as a fraction of its font size
+WRAP_MAX_SHIFT = 5  # pt; max left-edge (or centre) shift between the lines of a wrapped heading
+EXTRACTOR_VERSION = 1  # bump whenever extractor output changes; keys the cache.FeatureCache
+MIN_PAGES_PER_SHARD = 25  # smaller shards cost more in re-opening the file than they save
+X_HIST_BIN = 5  # pt; bin width of the per-page word-start histogram
+MIN_GUTTER = 10  # pt; smallest gap between words on either side of a column edge
 
 
-def process_pdf(pdf_path):
-    """Process a PDF and return a dict with title and outline."""
-    with pdfplumber.open(pdf_path) as pdf:
-        all_lines = []
-        for p_idx, page in enumerate(pdf.pages, start=1):
-            lines = extract_lines(page, p_idx)
-            all_lines.extend(lines)
+def process_pdf(pdf_path, page_workers=1, use_bookmarks=False, model=None, extractor="words", cache=None,
+                threshold=None, metrics=None, feature_cache=None):
+    """Process a PDF and return a dict with title and outline (options: see _process_pdf)."""
+    metrics = metrics or NULL_METRICS
+    options = dict(page_workers=page_workers, use_bookmarks=use_bookmarks, model=model, extractor=extractor,
+                   threshold=threshold or {}, metrics=metrics, feature_cache=feature_cache)
+    with metrics.stage("process_pdf"):
+        if cache is None:
+            return _process_pdf(pdf_path, **options)
+        with metrics.stage("result_cache"):
+            key = cache.key(pdf_path, **output_options(**options))
+            result = cache.get(key)
+        if result is not None:
+            metrics.count("result_cache_hits")
+            return result
+        result = _process_pdf(pdf_path, **options)
+        cache.put(key, result)
+        return result
+
+
+def output_options(use_bookmarks=False, model=None, extractor="words", threshold=None, **_):
+    """The process_pdf arguments that can change its result, as a JSON-serialisable dict (for cache keys and manifests)."""
+    return dict(use_bookmarks=use_bookmarks, extractor=extractor, weights=(model or ScoringModel()).weights,
+                threshold=threshold or {})
 
-    lines = drop_repeating_headers(all_lines)
-    lines = merge_wrapped_heading_lines(lines)
 
-    scored = score_lines(lines)
-    cands = [l for l in scored if l["score"] >= scored_threshold(scored)]
+def _process_pdf(pdf_path, *, page_workers, use_bookmarks, model, extractor, threshold, metrics, feature_cache):
+    """process_pdf without the result cache (a cache.ResultCache, keyed on output_options).
+
+    With page_workers > 1, documents long enough to split are extracted in page
+    shards across that many processes (see extract_lines_parallel). With
+    use_bookmarks, a document carrying an /Outlines bookmark tree is answered
+    from it directly. model is the scoring.ScoringModel used by score_lines;
+    extractor names the line extractor in EXTRACTORS; threshold holds
+    candidate_rows keyword arguments. A cache.FeatureCache stores extracted
+    lines so only the later stages re-run; metrics (a metrics.Metrics)
+    receives per-stage times and counts."""
+    key = cached = None
+    if feature_cache is not None:
+        with metrics.stage("feature_cache"):
+            key = feature_cache.key(pdf_path, extractor=extractor, version=EXTRACTOR_VERSION)
+            cached = feature_cache.get(key)
+        if cached is not None:
+            metrics.count("feature_cache_hits")
+    if cached is not None and not use_bookmarks:
+        metadata, all_lines = cached
+        return analyze_lines(all_lines, metadata, model, threshold, metrics)
+
+    with metrics.stage("open"):
+        pdf = pdfplumber.open(pdf_path)
+    with pdf:
+        metadata = pdf.metadata or {}
+        if use_bookmarks:
+            with metrics.stage("bookmarks"):
+                result = outline_from_bookmarks(pdf, metadata)
+            if result is not None:
+                metrics.count("outline_entries", len(result["outline"]))
+                return result
+            if cached is not None:
+                return analyze_lines(cached[1], metadata, model, threshold, metrics)
+        n_pages = len(pdf.pages)
+        if page_workers > 1 and n_pages >= 2 * MIN_PAGES_PER_SHARD:
+            all_lines = None
+        else:
+            all_lines = extract_page_range(pdf, 0, n_pages, extractor, metrics)
+    if all_lines is None:
+        with metrics.stage("extract_parallel"):
+            all_lines = extract_lines_parallel(pdf_path, n_pages, page_workers, extractor, metrics)
+    if feature_cache is not None:
+        with metrics.stage("feature_cache"):
+            feature_cache.put(key, metadata, all_lines)
+    return analyze_lines(all_lines, metadata, model, threshold, metrics)
 
-    title = detect_title(pdf_path, scored, cands)
-    outline = assign_levels(cands)
+
+def analyze_lines(all_lines, metadata, model=None, threshold=None, metrics=NULL_METRICS):
+    """Run every stage after extraction on a document's LineTable; returns the title/outline dict.
+
+    all_lines is modified in place."""
+    return outline_from_lines(prepare_lines(all_lines, metrics), metadata, model, threshold, metrics=metrics)
+
+
+def prepare_lines(all_lines, metrics=NULL_METRICS):
+    """Drop repeating headers/footers and merge wrapped headings: the stages that do not depend on the scoring model."""
+    with metrics.stage("headers"):
+        lines = drop_repeating_headers(all_lines)
+    metrics.count("header_lines_dropped", len(all_lines) - len(lines))
+    n = len(lines)
+    with metrics.stage("merge"):
+        lines = merge_wrapped_heading_lines(lines)
+    metrics.count("lines_merged", n - len(lines))
+    return lines
+
+
+def outline_from_lines(lines, metadata, model=None, threshold=None, features=None, metrics=NULL_METRICS):
+    """Score, threshold, title and level prepared lines; returns the title/outline dict.
+
+    features is the lines' feature_matrix, when the caller already has it."""
+    with metrics.stage("score"):
+        scored = score_lines(lines, model, features)
+    with metrics.stage("threshold"):
+        cands = scored.take(candidate_rows(scored, **(threshold or {})).tolist())
+    metrics.count("candidates", len(cands))
+
+    with metrics.stage("title"):
+        title = detect_title(metadata, scored, cands)
+    with metrics.stage("levels"):
+        outline = assign_levels(cands)
+    metrics.count("outline_entries", len(outline))
 
     return {"title": title, "outline": outline}
 
 
+def outline_from_bookmarks(pdf, metadata):
+    """Build the result from the PDF's bookmark tree; None if it has no usable bookmarks."""
+    page_nums = {page.page_obj.pageid: i for i, page in enumerate(pdf.pages, start=1)}
+    outline = []
+    for depth, text, dest, action in iter_bookmarks(pdf.doc):
+        page = resolve_bookmark_page(pdf.doc, dest, action, page_nums)
+        text = " ".join(text.split())
+        if page is None or not text:
+            continue
+        outline.append({"level": f"H{min(depth, 3)}", "text": text, "page": page})
+    if not outline:
+        return None
+    meta_title = metadata.get("Title", "")
+    meta_title = " ".join(meta_title.split()) if isinstance(meta_title, str) else ""
+    return {"title": meta_title or outline[0]["text"], "outline": outline}
+
+
+def iter_bookmarks(doc):
+    """Yield (depth, title, dest, action) for each /Outlines entry in document order.
+
+    Walks the tree iteratively: pdfminer's get_outlines() recurses once per
+    sibling and overflows the stack on long bookmark lists."""
+    root = resolve1(doc.catalog.get("Outlines"))
+    if not isinstance(root, dict):
+        return
+    stack = [(root.get("First"), 1)]
+    seen = set()
+    while stack:
+        ref, depth = stack.pop()
+        if isinstance(ref, PDFObjRef):
+            if ref.objid in seen:
+                continue  # malformed tree with a cycle
+            seen.add(ref.objid)
+        entry = resolve1(ref)
+        if not isinstance(entry, dict):
+            continue
+        # Push the next sibling before the first child so children come out first
+        if "Next" in entry:
+            stack.append((entry["Next"], depth))
+        if "First" in entry:
+            stack.append((entry["First"], depth + 1))
+        title = resolve1(entry.get("Title"))
+        if isinstance(title, bytes) and ("Dest" in entry or "A" in entry):
+            yield depth, decode_text(title), entry.get("Dest"), entry.get("A")
+
+
+def resolve_bookmark_page(doc, dest, action, page_nums):
+    """Map a bookmark's /Dest (or /GoTo action) to a 1-based page number, or None."""
+    if dest is None:
+        action = resolve1(action)
+        if not isinstance(action, dict) or getattr(resolve1(action.get("S")), "name", None) != "GoTo":
+            return None
+        dest = action.get("D")
+    dest = resolve1(dest)
+    if isinstance(dest, (bytes, PSLiteral)):  # named destination
+        try:
+            dest = resolve1(doc.get_dest(dest.name if isinstance(dest, PSLiteral) else dest))
+        except Exception:
+            return None
+    if isinstance(dest, dict):
+        dest = resolve1(dest.get("D"))
+    if not isinstance(dest, list) or not dest:
+        return None
+    target = dest[0]
+    if isinstance(target, PDFObjRef):
+        return page_nums.get(target.objid)
+    if isinstance(target, int):  # remote-style destinations use a 0-based page index
+        return target + 1 if 0 <= target < len(page_nums) else None
+    return None
+
+
+def extract_page_range(pdf, start, stop, extractor="words", metrics=NULL_METRICS):
+    """Extract lines for pages [start, stop) (0-based) of an open pdfplumber document into a LineTable.
+
+    Each page's parsed layout objects are released as soon as its lines have
+    been extracted, so only the table rows outlive the page. metrics times
+    pdfminer's layout ("parse") apart from the extractor's own work ("group")."""
+    extract = EXTRACTORS[extractor]
+    table = LineTable()
+    for p_idx, page in enumerate(pdf.pages[start:stop], start=start + 1):
+        with metrics.stage("parse"):
+            page.layout  # cached on the page, so the extractor reuses it
+        with metrics.stage("group"):
+            geometry, lines = extract(page, p_idx)
+            table.extend(lines)
+        table.pages[p_idx] = geometry
+        page.close()
+        metrics.count("words", sum(geometry.x_hist.values()))
+    metrics.count("pages", max(0, min(stop, len(pdf.pages)) - start))
+    metrics.count("lines", len(table))
+    return table
+
+
+def _extract_shard(pdf_path, start, stop, extractor, instrument=False):
+    """Worker entry point: open the PDF independently and extract one page shard.
+
+    With instrument, returns (table, Metrics.as_dict()) instead of the table."""
+    metrics = Metrics() if instrument else NULL_METRICS
+    with pdfplumber.open(pdf_path) as pdf:
+        table = extract_page_range(pdf, start, stop, extractor, metrics)
+    return (table, metrics.as_dict()) if instrument else table
+
+
+def extract_lines_parallel(pdf_path, n_pages, workers, extractor="words", metrics=NULL_METRICS):
+    """Extract lines from all pages using a process pool, merged back in page order.
+
+    Stage times gathered in the workers are summed across them into metrics."""
+    n_shards = max(1, min(workers * 4, n_pages // MIN_PAGES_PER_SHARD))
+    bounds = [n_pages * i // n_shards for i in range(n_shards + 1)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        shards = list(pool.map(_extract_shard, [pdf_path] * n_shards, bounds[:-1], bounds[1:],
+                               [extractor] * n_shards, [metrics.enabled] * n_shards))
+    if metrics.enabled:
+        for _, shard_metrics in shards:
+            metrics.merge(shard_metrics)
+        shards = [table for table, _ in shards]
+    return LineTable.concat(shards)
+
+
 def extract_lines(page, page_num):
-    """Extract lines from a pdfplumber page with font and layout metadata. Returns list of line dicts."""
+    """Extract lines from a pdfplumber page with font and layout metadata. Returns (PageGeometry, iterator of line dicts)."""
     # Get all words (pdfplumber's word extraction is robust for most PDFs)
     words = page.extract_words(extra_attrs=["fontname", "size"])
     if not words:
-        return []
+        return page_geometry(page, page_num, []), iter(())
 
     # Group words into lines by y0 (top) with a tolerance
     y_tol = 2.5  # points; adjust as needed
@@ -47,9 +279,154 @@ def extract_lines(page, page_num):
             last_y = w['top']
     if current_line:
         lines.append(current_line)
+    geometry = page_geometry(page, page_num, lines)
+    return geometry, line_dicts(split_columns(lines, geometry), geometry)
+
 
-    # Compute features for each line
-    line_dicts = []
+def layout_chars(page):
+    """Collect the page's pdfminer LTChar objects as small dicts in pdfplumber's top/bottom coordinates.
+
+    Reads page.layout directly rather than page.chars, which wraps every
+    layout object in a full attribute dict and dominates extraction time."""
+    mb_x0, mb_top = page.mediabox[:2]
+    height = page.height
+    chars = []
+    stack = [iter(page.layout)]
+    while stack:
+        for obj in stack[-1]:
+            if isinstance(obj, LTChar):
+                fontname = obj.fontname
+                if isinstance(fontname, bytes):
+                    fontname = fontname.decode("latin-1")
+                chars.append({'text': obj.get_text(), 'fontname': fontname, 'size': obj.size,
+                              'x0': obj.x0 + mb_x0, 'x1': obj.x1 + mb_x0,
+                              'top': height - obj.y1 + mb_top, 'bottom': height - obj.y0 + mb_top})
+            elif isinstance(obj, LTContainer):  # e.g. LTFigure: descend into its children
+                stack.append(iter(obj))
+                break
+        else:
+            stack.pop()
+    return chars
+
+
+def extract_lines_chars(page, page_num):
+    """Extract lines straight from the pdfminer layout's characters, skipping extract_words. Returns the same as extract_lines.
+
+    Characters are clustered into lines by top, then split into words on
+    whitespace, horizontal gaps and font changes in the same pass."""
+    chars = layout_chars(page)
+    if not chars:
+        return page_geometry(page, page_num, []), iter(())
+    y_tol = 2.5  # same line tolerance as extract_lines
+    x_tol = 3    # pdfplumber's default word-splitting gap
+    line_chars = []
+    current = []
+    last_y = None
+    for c in sorted(chars, key=lambda c: c['top']):
+        if last_y is None or abs(c['top'] - last_y) <= y_tol:
+            current.append(c)
+            last_y = c['top'] if last_y is None else (last_y + c['top']) / 2
+        else:
+            line_chars.append(current)
+            current = [c]
+            last_y = c['top']
+    if current:
+        line_chars.append(current)
+
+    lines = []
+    for cs in line_chars:
+        line = []
+        w = None
+        for c in sorted(cs, key=lambda c: c['x0']):
+            if c['text'].isspace():
+                w = None
+                continue
+            if (w is None or c['x0'] - w['x1'] > x_tol
+                    or c['fontname'] != w['fontname'] or c['size'] != w['size']):
+                w = {'text': c['text'], 'x0': c['x0'], 'x1': c['x1'], 'top': c['top'],
+                     'bottom': c['bottom'], 'fontname': c['fontname'], 'size': c['size']}
+                line.append(w)
+            else:
+                w['text'] += c['text']
+                w['x1'] = max(w['x1'], c['x1'])
+                w['top'] = min(w['top'], c['top'])
+                w['bottom'] = max(w['bottom'], c['bottom'])
+        if line:
+            lines.append(line)
+    geometry = page_geometry(page, page_num, lines)
+    return geometry, line_dicts(split_columns(lines, geometry), geometry)
+
+
+EXTRACTORS = {"words": extract_lines, "chars": extract_lines_chars}
+
+
+def page_geometry(page, page_num, lines):
+    """Measure a page once: real size, text margins, word-start histogram and column left edges.
+
+    lines are the page's lines as lists of word dicts. A column edge is a
+    word-start x-bin holding at least 15% as many words as there are lines,
+    a quarter page-width right of the previous edge and left of the text's
+    right edge (so right-aligned numbers are not a column), with (almost) no
+    word in the MIN_GUTTER band just left of it."""
+    words = [w for line in lines for w in line]
+    geometry = PageGeometry(page_num, float(page.width), float(page.height))
+    if not words:
+        return geometry
+    geometry.left = min(w['x0'] for w in words)
+    geometry.right = max(w['x1'] for w in words)
+    bin_min = {}
+    for w in words:
+        b = int(w['x0'] // X_HIST_BIN)
+        geometry.x_hist[b] = geometry.x_hist.get(b, 0) + 1
+        bin_min[b] = min(bin_min.get(b, w['x0']), w['x0'])
+    # Words in the band = words starting left of the edge minus words ending
+    # left of the band (those all start left of the edge too): two bisections
+    starts = sorted(w['x0'] for w in words)
+    ends = sorted(w['x1'] for w in words)
+    columns = [geometry.left]
+    min_count = max(3, 0.15 * len(lines))
+    for b in sorted(geometry.x_hist):
+        edge = bin_min[b]
+        if (geometry.x_hist[b] < min_count or edge - columns[-1] < geometry.width * 0.25
+                or geometry.right - edge < geometry.width * 0.25):
+            continue
+        in_band = bisect.bisect_left(starts, edge) - bisect.bisect_right(ends, edge - MIN_GUTTER)
+        if in_band <= 0.1 * len(lines):
+            columns.append(edge)
+    geometry.columns = columns
+    return geometry
+
+
+def split_columns(lines, geometry):
+    """Split lines at the page's column gutters and order the pieces column by column.
+
+    Lines are grouped by height across the whole page, so side-by-side
+    columns come out as one line; this restores reading order. A line is only
+    split where a gap of at least MIN_GUTTER straddles a column edge, so
+    full-width lines such as titles stay whole. Single-column pages are
+    returned unchanged."""
+    if len(geometry.columns) < 2:
+        return lines
+    pieces = []  # (column, line order, words)
+    for order, line in enumerate(lines):
+        line = sorted(line, key=lambda w: w['x0'])
+        current = [line[0]]
+        col = bisect.bisect_right(geometry.columns, line[0]['x0']) - 1
+        for prev, w in zip(line, line[1:]):
+            c = bisect.bisect_right(geometry.columns, w['x0']) - 1
+            if c != col and w['x0'] - prev['x1'] >= MIN_GUTTER and prev['x1'] < geometry.columns[c]:
+                pieces.append((col, order, current))
+                current, col = [], c
+            current.append(w)
+        pieces.append((col, order, current))
+    pieces.sort(key=lambda p: (p[0], p[1]))
+    return [p[2] for p in pieces]
+
+
+def line_dicts(lines, geometry):
+    """Compute the features of each line (a list of word dicts) on a page. Yields line dicts."""
+    # Per-word font lists are summarised (dominant font, bold flag, mean size)
+    # rather than kept on the line
     prev_bottom = None
     for line in lines:
         text = " ".join(w['text'] for w in line).strip()
@@ -63,13 +440,12 @@ def extract_lines(page, page_num):
         is_all_caps = text.isupper() and len(text) > 2
         avg_font_size = sum(font_sizes) / len(font_sizes) if font_sizes else 0
         leading = (top - prev_bottom) if prev_bottom is not None else 0
-        indent = x0 - min(w['x0'] for w in words)  # relative to leftmost word on page
+        indent = x0 - geometry.column_left(x0)  # relative to the left edge of its column
         prev_bottom = bottom
-        line_dicts.append({
-            "page": page_num,
+        yield {
+            "page": geometry.page,
             "text": text,
-            "font_names": font_names,
-            "font_sizes": font_sizes,
+            "font_name": Counter(font_names).most_common(1)[0][0],
             "x0": x0,
             "x1": x1,
             "top": top,
@@ -79,119 +455,192 @@ def extract_lines(page, page_num):
             "avg_font_size": avg_font_size,
             "leading": leading,
             "indent": indent
-        })
-    return line_dicts
+        }
 
 
-def drop_repeating_headers(lines):
-    """Remove lines that appear as headers/footers on most pages."""
-    # TODO: Implement header/footer detection
-    return lines
+def drop_repeating_headers(lines, min_fraction=HEADER_MIN_FRACTION):
+    """Remove lines that appear as headers/footers on most pages.
+
+    Lines in the top/bottom HEADER_ZONE of their page are bucketed in one pass
+    by text with digit runs masked ("Page 3 of 40" -> "page # of #") and by
+    HEADER_TOL_Y-high band of their distance from the nearer page edge. A
+    bucket whose text shows up, in that band or a neighbouring one, on at
+    least min_fraction of the pages is dropped."""
+    pages_with_text = set(lines.page)
+    if len(pages_with_text) < 3:  # too few pages to tell a header from a coincidence
+        return lines
+    keys = []
+    buckets = {}  # (masked text, band) -> pages
+    for i, text in enumerate(lines.text):
+        page = lines.page[i]
+        geometry = lines.pages.get(page)
+        top = lines.top[i]
+        if geometry is not None:
+            if HEADER_ZONE * geometry.height < top < (1 - HEADER_ZONE) * geometry.height:
+                keys.append(None)  # body text
+                continue
+            # Bottom-zone lines are measured up from the bottom edge (as
+            # negative offsets) so footers line up across page heights
+            if top > geometry.height / 2:
+                top -= geometry.height
+        norm = " ".join(DIGIT_RUN.sub("#", text).lower().split())
+        key = (norm, math.floor(top / HEADER_TOL_Y))
+        keys.append(key)
+        if norm:
+            buckets.setdefault(key, set()).add(page)
+    need = max(3, math.ceil(min_fraction * len(pages_with_text)))
+    repeating = set()
+    for (norm, band), pages in buckets.items():
+        if len(pages) >= need or len(pages | buckets.get((norm, band - 1), set()) | buckets.get((norm, band + 1), set())) >= need:
+            repeating.add((norm, band))
+    if not repeating:
+        return lines
+    return lines.take([i for i, key in enumerate(keys) if key not in repeating])
 
 
 def merge_wrapped_heading_lines(lines):
-    """Merge lines that are likely part of the same heading split across lines."""
-    # TODO: Implement line merging
+    """Merge lines that are likely part of the same heading split across lines.
+
+    A single forward pass compacts the LineTable in place: a line is folded
+    into the previous kept line when both are prominent (bold, or larger than
+    the median size), on the same page, in the same font and size, separated
+    by less than WRAP_MAX_GAP x the size, and left- or centre-aligned within
+    WRAP_MAX_SHIFT."""
+    n = len(lines)
+    if n < 2:
+        return lines
+    sizes = [s for s in lines.avg_font_size if s > 0]
+    body_size = statistics.median(sizes) if sizes else 0
+    page, font_id, size = lines.page, lines.font_id, lines.avg_font_size
+    x0, x1, top, bottom = lines.x0, lines.x1, lines.top, lines.bottom
+    kept = 0  # rows [0, kept) are final
+    for i in range(n):
+        k = kept - 1
+        if (k >= 0 and page[i] == page[k] and font_id[i] == font_id[k]
+                and abs(size[i] - size[k]) < 0.01
+                and (lines.is_boldish[i] or size[i] > body_size + 0.5)
+                and -1 <= top[i] - bottom[k] <= WRAP_MAX_GAP * size[i]
+                and (abs(x0[i] - x0[k]) <= WRAP_MAX_SHIFT
+                     or abs((x0[i] + x1[i]) - (x0[k] + x1[k])) / 2 <= WRAP_MAX_SHIFT)):
+            lines.text[k] = f"{lines.text[k]} {lines.text[i]}"
+            x0[k] = min(x0[k], x0[i])
+            x1[k] = max(x1[k], x1[i])
+            bottom[k] = bottom[i]
+            lines.indent[k] = min(lines.indent[k], lines.indent[i])
+            lines.is_all_caps[k] = lines.is_all_caps[k] and lines.is_all_caps[i]
+            continue
+        if kept != i:
+            lines.move_row(i, kept)
+        kept += 1
+    lines.truncate(kept)
     return lines
 
 
-def score_lines(lines):
-    """Score each line for heading likelihood using multi-signal heuristics. Returns list of dicts with 'score'."""
+def score_lines(lines, model=None, features=None):
+    """Score each line of a LineTable for heading likelihood using multi-signal heuristics. Fills and returns the table's 'score' column.
+
+    model is a scoring.ScoringModel (default weights when None); features a
+    precomputed feature_matrix(lines)."""
     if not lines:
-        return []
+        return lines
+    model = model or ScoringModel()
+    if features is None:
+        features = feature_matrix(lines)
+    lines.score = array("d", model.score(features).tobytes())
+    return lines
+
+
+def feature_matrix(lines):
+    """Build the (n_lines, len(FEATURES)) float matrix of heading signals for a LineTable."""
     # Compute page median font size for z-score
-    font_sizes = [l["avg_font_size"] for l in lines if l["avg_font_size"] > 0]
+    font_sizes = [s for s in lines.avg_font_size if s > 0]
     if not font_sizes:
         font_sizes = [10.0]  # fallback
     median_size = statistics.median(font_sizes)
     stdev_size = statistics.stdev(font_sizes) if len(font_sizes) > 1 else 1.0
     # Compute median line spacing (leading)
-    leadings = [l["leading"] for l in lines if l["leading"] > 0]
+    leadings = [v for v in lines.leading if v > 0]
     median_leading = statistics.median(leadings) if leadings else 0
-    # For indent, get leftmost x0 as margin
-    min_x0 = min(l["x0"] for l in lines)
-    # Score each line
-    for l in lines:
-        score = 0.0
-        size_z = (l["avg_font_size"] - median_size) / stdev_size if stdev_size else 0
-        score += size_z * 2.0
-        if l["is_boldish"]:
-            score += 1.0
-        len_tokens = len(l["text"].split())
-        if 5 < len_tokens < 25:
-            score += 1.0
-        elif len_tokens <= 5:
-            score -= 0.25
-        # Numbering pattern
-        if NUM_PAT.match(l["text"]):
-            score += 1.5
-        # Gap above (leading)
-        gap_above_ratio = l["leading"] / median_leading if median_leading and l["leading"] else 1.0
-        if gap_above_ratio > 1.5:
-            score += 0.75
-        # Ends with colon
-        if l["text"].rstrip().endswith(":"):
-            score += 0.25
-        # All caps
-        if l["is_all_caps"]:
-            score += 0.5
-        # Indent pattern
-        if abs(l["indent"]) < 5:
-            score += 0.5
-        # Page 1, top 25%
-        if l["page"] == 1 and l["top"] < (page_height_hint(l) * 0.25):
-            score += 1.0
-        l["score"] = score
-    return lines
+    # Every signal is computed over the whole column at once (zero-copy views
+    # of the table's arrays); only the text tests need a pass over the strings
+    avg_font_size = np.frombuffer(lines.avg_font_size)
+    leading = np.frombuffer(lines.leading)
+    page = np.frombuffer(lines.page, dtype=np.int32)
+    texts = lines.text
+    n = len(texts)
+    X = np.zeros((n, len(FEATURES)))
+    col = {f: X[:, j] for j, f in enumerate(FEATURES)}
+    if stdev_size:
+        col["size_z"][:] = (avg_font_size - median_size) / stdev_size
+    col["bold"][:] = np.frombuffer(lines.is_boldish, dtype=np.int8) != 0
+    len_tokens = np.fromiter((len(t.split()) for t in texts), dtype=np.int64, count=n)
+    col["mid_length"][:] = (len_tokens > 5) & (len_tokens < 25)
+    col["short"][:] = len_tokens <= 5
+    # Numbering pattern
+    col["numbered"][:] = np.fromiter((NUM_PAT.match(t) is not None for t in texts), dtype=bool, count=n)
+    # Gap above (leading): ratio to median spacing, 1.0 when either is zero
+    if median_leading:
+        col["gap_above"][:] = (leading != 0) & (leading / median_leading > 1.5)
+    # Ends with colon
+    col["colon"][:] = np.fromiter((t.rstrip().endswith(":") for t in texts), dtype=bool, count=n)
+    col["all_caps"][:] = np.frombuffer(lines.is_all_caps, dtype=np.int8) != 0
+    # Indent pattern
+    col["flush_left"][:] = np.abs(np.frombuffer(lines.indent)) < 5
+    # Page 1, top 25%
+    page_height = page_height_hint({"bottom": np.frombuffer(lines.bottom)}, lines.pages.get(1))
+    col["title_zone"][:] = (page == 1) & (np.frombuffer(lines.top) < page_height * 0.25)
+    return X
+
+
+def candidate_rows(scored, strategy="mean_std", k=1.0, top=0.1):
+    """Ascending row indices of a scored LineTable's heading candidates.
+
+    Call once per document. strategy is "mean_std" (scores >= mean + k*stdev,
+    the default rule), "percentile" (exactly the best ceil(top * n) lines) or
+    "otsu" (scores >= the histogram split)."""
+    return select_candidates(np.frombuffer(scored.score), strategy, k=k, top=top)
 
 
-def scored_threshold(scored):
-    """Compute adaptive threshold for heading candidate selection."""
-    scores = [l["score"] for l in scored]
-    if not scores:
-        return 0
-    mean = statistics.mean(scores)
-    stdev = statistics.stdev(scores) if len(scores) > 1 else 0
-    return mean + stdev
+def scored_threshold(scored, strategy="mean_std", k=1.0, top=0.1):
+    """Score cut-off of candidate_rows' strategies, for a LineTable or a thresholds.ScoreSketch
+    fed with scores in chunks (where a percentile cut keeps ties, see ScoreSketch)."""
+    scores = scored if isinstance(scored, ScoreSketch) else np.frombuffer(scored.score)
+    return compute_threshold(scores, strategy, k=k, top=top)
 
 
-def detect_title(pdf_path, scored, cands):
-    """Detect the document title using heuristics and PDF metadata."""
+def detect_title(metadata, scored, cands):
+    """Detect the document title using heuristics and the PDF metadata dict captured at open time."""
     # 1. Try PDF metadata
-    try:
-        import pdfplumber
-        with pdfplumber.open(pdf_path) as pdf:
-            meta_title = (pdf.metadata or {}).get("Title", "")
-    except Exception:
-        meta_title = ""
-    meta_title = meta_title.strip() if meta_title else ""
-    if meta_title and any(meta_title.lower() in l["text"].lower() for l in scored[:20]):
+    meta_title = (metadata or {}).get("Title", "")
+    meta_title = meta_title.strip() if isinstance(meta_title, str) else ""
+    if meta_title and any(meta_title.lower() in t.lower() for t in scored.text[:20]):
         return " ".join(meta_title.split())
     # 2. Highest-scoring heading on page 1
-    page1 = [l for l in cands if l["page"] == 1]
+    page1 = [i for i, p in enumerate(cands.page) if p == 1]
     if page1:
-        best = max(page1, key=lambda l: l["score"])
-        if best["score"] > 0:
-            return " ".join(best["text"].split())
+        best = max(page1, key=cands.score.__getitem__)
+        if cands.score[best] > 0:
+            return " ".join(cands.text[best].split())
     # 3. First large centered line on page 1
-    page1_lines = [l for l in scored if l["page"] == 1]
+    page1_lines = [i for i, p in enumerate(scored.page) if p == 1]
     if page1_lines:
-        page_width = max((l["x1"] for l in page1_lines), default=600)
-        for l in page1_lines:
-            center = abs((l["x0"] + l["x1"]) / 2 - page_width / 2)
-            if l["avg_font_size"] > statistics.median([x["avg_font_size"] for x in page1_lines]) and center < page_width * 0.15:
-                return " ".join(l["text"].split())
+        page_width = max((scored.x1[i] for i in page1_lines), default=600)
+        median_size = statistics.median([scored.avg_font_size[i] for i in page1_lines])
+        for i in page1_lines:
+            center = abs((scored.x0[i] + scored.x1[i]) / 2 - page_width / 2)
+            if scored.avg_font_size[i] > median_size and center < page_width * 0.15:
+                return " ".join(scored.text[i].split())
     # 4. Fallback: first H1 candidate
     if cands:
-        return " ".join(cands[0]["text"].split())
+        return " ".join(cands.text[0].split())
     return None
 
 def assign_levels(cands):
-    """Assign H1/H2/H3 levels to heading candidates and return outline list."""
+    """Assign H1/H2/H3 levels to the heading candidates in a LineTable and return outline list."""
     if not cands:
         return []
     # Cluster font sizes (k=3 or unique sizes)
-    sizes = sorted(set(l["avg_font_size"] for l in cands))
+    sizes = sorted(set(cands.avg_font_size))
     if len(sizes) >= 3:
         thresholds = [sizes[-1], sizes[-2], sizes[-3]]
     else:
@@ -216,35 +665,46 @@ def assign_levels(cands):
                 return 1
         return None
     # Assign levels
-    outline = []
+    entries = []  # (level, text, page)
     seen = set()
-    for l in cands:
-        f_level = font_level(l["avg_font_size"])
-        n_level = numbering_level(l["text"])
+    has_h1 = False
+    for i, text in enumerate(cands.text):
+        f_level = font_level(cands.avg_font_size[i])
+        n_level = numbering_level(text)
         level = min(f_level, n_level) if n_level else f_level
         # Indent tiebreaker
-        if level > 1 and l["indent"] > 10:
+        if level > 1 and cands.indent[i] > 10:
             level = min(level + 1, 3)
         # Remove duplicates (same text, page, y)
-        key = (l["text"].strip(), l["page"], round(l["top"]))
+        key = (text.strip(), cands.page[i], round(cands.top[i]))
         if key in seen:
             continue
         seen.add(key)
+        entries.append((level, text.strip(), cands.page[i]))
+        has_h1 = has_h1 or level == 1
+    # Guarantee at least one H1
+    if entries and not has_h1:
+        entries[0] = (1,) + entries[0][1:]
+    # Emit the outline in one pass over the stack of open headings, demoting
+    # isolated H3s (no H2 open since the last H1) to H2
+    outline = []
+    open_levels = []  # at most [1, 2]
+    for level, text, page in entries:
+        while open_levels and open_levels[-1] >= level:
+            open_levels.pop()
+        if level == 3 and 2 not in open_levels:
+            level = 2
+        open_levels.append(level)
         outline.append({
             "level": f"H{level}",
-            "text": l["text"].strip(),
-            "page": l["page"]
+            "text": text,
+            "page": page
         })
-    # Guarantee at least one H1
-    if not any(o["level"] == "H1" for o in outline) and outline:
-        outline[0]["level"] = "H1"
-    # Demote isolated H3s
-    for i, o in enumerate(outline):
-        if o["level"] == "H3" and not any(p["level"] == "H2" for p in outline[:i]):
-            o["level"] = "H2"
     return outline
 
-def page_height_hint(line):
-    """Estimate page height from line's top/bottom (for title boost)."""
-    # This is a fallback; ideally, pass page height from pdfplumber
-    return max(line["bottom"] + 50, 792)  # 792pt = 11in page 
\ No newline at end of file
+def page_height_hint(line, geometry=None):
+    """Page height for the title boost: the measured PageGeometry height, else estimated from the line's bottom."""
+    if geometry is not None:
+        return geometry.height
+    # Fallback for tables built without geometry; works on scalars and arrays
+    return np.maximum(line["bottom"] + 50, 792)  # 792pt = 11in page 
\ No newline at end of file
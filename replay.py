@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Replay the post-extraction stages over cached line features and sweep scoring
+configurations against a labeled ground-truth set.
+
+Ground truth is one JSON file per PDF, named and shaped like main.py's output
+({"title": ..., "outline": [{"level", "text", "page"}]}). The grid is a JSON
+file of candidate values, e.g.
+
+    {"weights": {"size_z": [1.5, 2.0, 2.5], "numbered": [1.0, 1.5]},
+     "threshold": {"strategy": ["mean_std", "otsu"], "k": [0.75, 1.0]}}
+
+and every combination is evaluated; weights not listed keep their defaults.
+Features missing from --feature-cache-dir are extracted (and stored) first.
+"""
+import argparse, itertools, json, sys, time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from cache import FeatureCache
+from processor import EXTRACTOR_VERSION, EXTRACTORS, feature_matrix, outline_from_lines, prepare_lines, process_pdf
+from scoring import ScoringModel
+
+# threshold parameters that matter to each strategy; others are dropped so the grid has no duplicate configs
+THRESHOLD_PARAMS = {"mean_std": ("k",), "percentile": ("top",), "otsu": ()}
+
+
+def expand_grid(grid):
+    """List of {"weights": {...}, "threshold": {...}} configs, one per combination of the grid's values."""
+    weights = grid.get("weights", {})
+    threshold = {"strategy": ["mean_std"], **grid.get("threshold", {})}
+    names = [("weights", k) for k in weights] + [("threshold", k) for k in threshold]
+    values = [weights[k] for k in weights] + [threshold[k] for k in threshold]
+    configs, seen = [], set()
+    for combo in itertools.product(*values):
+        config = {"weights": {}, "threshold": {}}
+        for (group, name), value in zip(names, combo):
+            config[group][name] = value
+        th = config["threshold"]
+        config["threshold"] = {k: v for k, v in th.items() if k == "strategy" or k in THRESHOLD_PARAMS[th["strategy"]]}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def load_features(pdf_path, extractor, feature_cache):
+    """(metadata, LineTable) for a PDF, extracting it into the cache first if needed."""
+    key = feature_cache.key(pdf_path, extractor=extractor, version=EXTRACTOR_VERSION)
+    cached = feature_cache.get(key)
+    if cached is None:
+        process_pdf(pdf_path, extractor=extractor, feature_cache=feature_cache)
+        cached = feature_cache.get(key)
+    return cached
+
+
+def replay_document(pdf_path, configs, extractor, feature_cache):
+    """Run every config on one document; returns (load+prepare seconds, [(result, seconds) per config])."""
+    start = time.perf_counter()
+    metadata, lines = load_features(pdf_path, extractor, feature_cache)
+    lines = prepare_lines(lines)
+    features = feature_matrix(lines) if lines else None
+    prepared = time.perf_counter() - start
+    runs = []
+    for config in configs:
+        start = time.perf_counter()
+        model = ScoringModel(weights=config["weights"])
+        result = outline_from_lines(lines, metadata, model, config["threshold"], features)
+        runs.append((result, time.perf_counter() - start))
+    return prepared, runs
+
+
+def _norm(text):
+    return " ".join((text or "").split()).lower()
+
+
+def compare(result, truth):
+    """Counts for one document: matched/predicted/expected headings, matched with the right level, title hit."""
+    pred = Counter((_norm(h["text"]), h["page"]) for h in result["outline"])
+    gold = Counter((_norm(h["text"]), h["page"]) for h in truth["outline"])
+    pred_lv = Counter((_norm(h["text"]), h["page"], h["level"]) for h in result["outline"])
+    gold_lv = Counter((_norm(h["text"]), h["page"], h["level"]) for h in truth["outline"])
+    return {"matched": sum((pred & gold).values()), "predicted": sum(pred.values()),
+            "expected": sum(gold.values()), "level_ok": sum((pred_lv & gold_lv).values()),
+            "title_ok": int(_norm(result["title"]) == _norm(truth["title"]))}
+
+
+def summarize(config, counts, seconds, n_docs):
+    p = counts["matched"] / counts["predicted"] if counts["predicted"] else 0.0
+    r = counts["matched"] / counts["expected"] if counts["expected"] else 0.0
+    return {"config": config, "precision": p, "recall": r, "f1": 2 * p * r / (p + r) if p + r else 0.0,
+            "level_accuracy": counts["level_ok"] / counts["matched"] if counts["matched"] else 0.0,
+            "title_accuracy": counts["title_ok"] / n_docs if n_docs else 0.0,
+            "seconds": seconds, "ms_per_doc": 1000 * seconds / n_docs if n_docs else 0.0}
+
+
+def sweep(docs, configs, extractor, feature_cache, workers=1):
+    """Evaluate configs over [(pdf_path, truth dict)]; returns (per-config summaries, stats dict)."""
+    counts = [Counter() for _ in configs]
+    seconds = [0.0] * len(configs)
+    stats = {"documents": 0, "failed": 0, "prepare_seconds": 0.0}
+
+    def collect(truth, prepared, runs):
+        stats["documents"] += 1
+        stats["prepare_seconds"] += prepared
+        for i, (result, secs) in enumerate(runs):
+            counts[i].update(compare(result, truth))
+            seconds[i] += secs
+
+    start = time.perf_counter()
+    if workers <= 1:
+        for pdf_path, truth in docs:
+            try:
+                collect(truth, *replay_document(pdf_path, configs, extractor, feature_cache))
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"ERROR replaying {pdf_path.name}: {e}", file=sys.stderr)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(pdf_path, truth, pool.submit(replay_document, pdf_path, configs, extractor, feature_cache))
+                       for pdf_path, truth in docs]
+            for pdf_path, truth, fut in futures:
+                try:
+                    collect(truth, *fut.result())
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"ERROR replaying {pdf_path.name}: {e}", file=sys.stderr)
+    stats["wall_seconds"] = time.perf_counter() - start
+    n = stats["documents"]
+    return [summarize(c, counts[i], seconds[i], n) for i, c in enumerate(configs)], stats
+
+
+def describe(config):
+    weights = " ".join(f"{k}={v}" for k, v in config["weights"].items())
+    threshold = " ".join(f"{k}={v}" for k, v in config["threshold"].items())
+    return f"{weights} {threshold}".strip()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--input_dir", required=True, help="directory of PDFs")
+    ap.add_argument("--truth_dir", required=True, help="directory of expected <stem>.json outlines")
+    ap.add_argument("--feature-cache-dir", required=True)
+    ap.add_argument("--extractor", choices=sorted(EXTRACTORS), default="words")
+    ap.add_argument("--grid", help="JSON grid of weights/threshold values (default: the default config only)")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--report", help="write every config's scores to this JSON file")
+    args = ap.parse_args()
+
+    grid = json.loads(Path(args.grid).read_text(encoding="utf-8")) if args.grid else {}
+    configs = expand_grid(grid)
+    for config in configs:
+        ScoringModel(weights=config["weights"])  # reject unknown feature names before any work
+    pdfs = {p.stem: p for p in Path(args.input_dir).iterdir() if p.suffix.lower() == ".pdf"}
+    docs = []
+    for truth_path in sorted(Path(args.truth_dir).glob("*.json")):
+        if truth_path.stem in pdfs:
+            docs.append((pdfs[truth_path.stem], json.loads(truth_path.read_text(encoding="utf-8"))))
+    if not docs:
+        print("No PDFs with ground truth found", file=sys.stderr)
+        return
+
+    results, stats = sweep(docs, configs, args.extractor, FeatureCache(args.feature_cache_dir), args.workers)
+    results.sort(key=lambda r: (-r["f1"], -r["title_accuracy"], r["seconds"]))
+    print(f"{stats['documents']} documents ({stats['failed']} failed), {len(configs)} configs, "
+          f"{stats['wall_seconds']:.2f}s wall, load+prepare {stats['prepare_seconds']:.2f}s")
+    print(f"{'f1':>6} {'prec':>6} {'rec':>6} {'level':>6} {'title':>6} {'ms/doc':>8}  config")
+    for r in results:
+        print(f"{r['f1']:6.3f} {r['precision']:6.3f} {r['recall']:6.3f} {r['level_accuracy']:6.3f} "
+              f"{r['title_accuracy']:6.3f} {r['ms_per_doc']:8.3f}  {describe(r['config'])}")
+    if args.report:
+        Path(args.report).write_text(json.dumps({"stats": stats, "results": results}, indent=2), encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Statistical CPU profiler for main.py --sample-profile: SIGPROF stack sampling into folded stacks."""
+import signal, time
+from pathlib import Path
+
+
+class StackSampler:
+    """Samples the Python stack of the main thread hz times per CPU second while active.
+
+    Used as a context manager around one call of root (a function or code
+    object); samples outside that call tree are dropped. Stacks are kept as
+    folded strings, "root;caller;callee" -> sample count, the input format of
+    flamegraph.pl and speedscope. Only this process is sampled, not
+    page-shard workers. overhead is the time spent in the signal handler."""
+
+    def __init__(self, root, hz=100):
+        self.root = getattr(root, "__code__", root)
+        self.interval = 1 / hz
+        self.stacks = {}
+        self.samples = 0
+        self.dropped = 0
+        self.overhead = 0.0
+        self.elapsed = 0.0
+        self._labels = {}  # code object -> frame label
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        self._started = time.perf_counter()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous)
+        self.elapsed += time.perf_counter() - self._started
+
+    def _label(self, code):
+        label = self._labels[code] = f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self, signum, frame):
+        start = time.perf_counter()
+        labels, root = self._labels, self.root
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(labels.get(code) or self._label(code))
+            if code is root:
+                break
+            frame = frame.f_back
+        if frame is None:
+            self.dropped += 1
+        else:
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+        self.overhead += time.perf_counter() - start
+
+    def as_dict(self):
+        return {"hz": round(1 / self.interval), "samples": self.samples, "dropped": self.dropped,
+                "overhead_ms": round(self.overhead * 1000, 3),
+                "overhead_pct": round(100 * self.overhead / self.elapsed, 3) if self.elapsed else 0.0,
+                "stacks": self.stacks}
+
+
+def merge_stacks(into, stacks):
+    """Add folded stack counts to into, e.g. a batch total from per-document samples."""
+    for stack, n in stacks.items():
+        into[stack] = into.get(stack, 0) + n
+    return into
+
+
+def format_folded(stacks):
+    """Folded-stack text, one "frame;frame;frame count" line per stack."""
+    return "".join(f"{stack} {n}\n" for stack, n in sorted(stacks.items()))
@@ -0,0 +1,59 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+
+# Column order of the feature matrix built by processor.feature_matrix
+FEATURES = (
+    "size_z",      # font size z-score against the document median
+    "bold",        # any word in a bold/black face
+    "mid_length",  # 5 < tokens < 25
+    "short",       # tokens <= 5
+    "numbered",    # starts with a section number (NUM_PAT)
+    "gap_above",   # leading > 1.5x the median leading
+    "colon",       # ends with ':'
+    "all_caps",
+    "flush_left",  # |indent| < 5
+    "title_zone",  # top quarter of page 1
+)
+
+DEFAULT_WEIGHTS = {
+    "size_z": 2.0,
+    "bold": 1.0,
+    "mid_length": 1.0,
+    "short": -0.25,
+    "numbered": 1.5,
+    "gap_above": 0.75,
+    "colon": 0.25,
+    "all_caps": 0.5,
+    "flush_left": 0.5,
+    "title_zone": 1.0,
+}
+
+
+@dataclass
+class ScoringModel:
+    """Linear heading-likelihood model: score = feature matrix @ weight vector."""
+    weights: dict = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+    name: str = "default"
+
+    def __post_init__(self):
+        unknown = set(self.weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown scoring features: {', '.join(sorted(unknown))}")
+        # Features the model does not mention keep their default weight
+        self.weights = {f: float(self.weights.get(f, DEFAULT_WEIGHTS[f])) for f in FEATURES}
+        self.vector = np.array([self.weights[f] for f in FEATURES])
+
+    @classmethod
+    def from_json(cls, path):
+        """Load a model from {"name": ..., "weights": {feature: weight}}."""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(weights=data.get("weights", {}), name=data.get("name", Path(path).stem))
+
+    def to_json(self, path):
+        Path(path).write_text(json.dumps({"name": self.name, "weights": self.weights}, indent=2), encoding="utf-8")
+
+    def score(self, features):
+        """Score an (n_lines, len(FEATURES)) matrix in one matrix-vector product."""
+        return features @ self.vector
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""HTTP front end for process_pdf: POST a PDF body to /outline, get the outline JSON back.
+
+    python server.py --port 8080 --workers 4
+    curl --data-binary @doc.pdf http://127.0.0.1:8080/outline
+
+At most --workers documents are processed at once and at most --max-queue
+more wait for a worker; beyond that requests get 503. Every response carries
+X-Queue-Ms (wait for a worker), X-Process-Ms (time in the worker) and
+X-Total-Ms (request received to response sent) headers.
+"""
+import argparse, asyncio, json, multiprocessing, os, signal, sys, tempfile, time
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from pathlib import Path
+from main import add_pipeline_args, pipeline_options, run_one, warm_pool
+
+MAX_HEADER_BYTES = 16 << 10
+
+
+def pool_context():
+    """Start method for worker pools: forked workers would inherit the listening socket
+    and open connections, so closing a connection would no longer reach the client.
+    The fork server preloads the pipeline, keeping restarts cheap."""
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["main"])
+    return ctx
+
+
+def process_body(data, options):
+    """Run process_pdf on PDF bytes in a worker process; returns run_one's (result, error, stats)."""
+    fd, tmp = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return run_one(Path(tmp), **options)
+    finally:
+        os.unlink(tmp)
+
+
+class OutlineServer:
+    """Request handling state: the warm pool, the concurrency cap and the wait queue bound.
+
+    Construct it before the listener starts, since the first pool is warmed synchronously."""
+
+    def __init__(self, options, workers=1, max_queue=16, max_body=64 << 20, verbose=False):
+        self.options = options
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.verbose = verbose
+        self.context = pool_context()
+        self.pool = warm_pool(self.workers, self.context)
+        self.restarting = asyncio.Lock()  # held while a broken pool is replaced
+        self.slots = asyncio.Semaphore(self.workers)
+        self.admitted = 0  # accepted POSTs not yet answered: reading their body, waiting or running
+        self.running = 0
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it or asks to."""
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 431, {"error": "request header too large"}, close=True)
+                    break
+                start = time.perf_counter()
+                try:
+                    method, path, headers = parse_head(head)
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "malformed request"}, close=True)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, body, extra = self.route(method, path, headers, length)
+                if status is None:
+                    if headers.get("expect", "").lower() == "100-continue":
+                        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    try:
+                        status, body, extra = await self.outline(await reader.readexactly(length))
+                    finally:
+                        self.admitted -= 1
+                elif length:
+                    keep_alive = False  # the request body was never read off the connection
+                extra["X-Total-Ms"] = f"{(time.perf_counter() - start) * 1000:.1f}"
+                await self.respond(writer, status, body, extra, close=not keep_alive)
+                if self.verbose:
+                    print(f"{method} {path} {status} {extra['X-Total-Ms']}ms", file=sys.stderr)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def route(self, method, path, headers, length):
+        """(status, JSON body, extra headers) for requests answered without reading a body;
+        status None for an accepted POST /outline."""
+        if path == "/health":
+            return 200, {"status": "ok", "workers": self.workers, "running": self.running,
+                         "waiting": self.admitted - self.running}, {}
+        if path != "/outline":
+            return 404, {"error": "not found"}, {}
+        if method != "POST":
+            return 405, {"error": "POST a PDF body"}, {"Allow": "POST"}
+        if "content-length" not in headers:
+            return 411, {"error": "Content-Length required"}, {}
+        if length > self.max_body:
+            return 413, {"error": f"body larger than {self.max_body} bytes"}, {}
+        if self.admitted >= self.workers + self.max_queue:
+            return 503, {"error": "queue full"}, {"Retry-After": "1"}
+        self.admitted += 1
+        return None, None, None
+
+    async def outline(self, data):
+        """(status, JSON body, extra headers) for a PDF body, once a worker is free."""
+        queued = time.perf_counter()
+        await self.slots.acquire()
+        extra = {"X-Queue-Ms": f"{(time.perf_counter() - queued) * 1000:.1f}"}
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            async with self.restarting:  # wait out a restart rather than submit to the broken pool
+                pool = self.pool
+            result, err, _ = await asyncio.get_running_loop().run_in_executor(
+                pool, process_body, data, self.options)
+        except BrokenProcessPool as e:
+            await self.restart_pool(pool)
+            result, err = None, f"worker crashed: {e}"
+        finally:
+            self.running -= 1
+            self.slots.release()
+        extra["X-Process-Ms"] = f"{(time.perf_counter() - started) * 1000:.1f}"
+        if err:
+            return 422, {"error": err}, extra
+        return 200, result, extra
+
+    async def restart_pool(self, broken):
+        """Replace the pool broken by a crashed worker, once however many requests it failed;
+        requests still on the old one fail with it. Warming runs off the event loop."""
+        async with self.restarting:
+            if self.pool is not broken:  # another request already replaced it
+                return
+            self.pool = await asyncio.get_running_loop().run_in_executor(
+                None, warm_pool, self.workers, self.context)
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    async def respond(self, writer, status, body, extra=None, close=False):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                 "Content-Type: application/json; charset=utf-8",
+                 f"Content-Length: {len(payload)}"]
+        lines += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        if close:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+
+def parse_head(head):
+    """(method, path, lower-cased header dict) from the raw request line and headers."""
+    request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    method, target, _ = request_line.split(" ", 2)
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method.upper(), target.split("?", 1)[0], headers
+
+
+async def serve(host, port, server):
+    listener = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER_BYTES)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"Listening on http://{host}:{port}", file=sys.stderr)
+    try:
+        await stop.wait()
+        listener.close()
+    finally:
+        server.pool.shutdown(cancel_futures=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="worker processes, i.e. documents processed concurrently")
+    ap.add_argument("--max-queue", type=int, default=16, help="requests allowed to wait for a worker before 503s")
+    ap.add_argument("--max-body-mb", type=int, default=64, help="largest accepted PDF (413 beyond)")
+    add_pipeline_args(ap)
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    server = OutlineServer(pipeline_options(args), args.workers, args.max_queue, args.max_body_mb << 20, args.verbose)
+    asyncio.run(serve(args.host, args.port, server))
+
+if __name__ == "__main__":
+    main()
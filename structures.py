@@ -1,13 +1,14 @@
+import numpy as np
+from array import array
 from dataclasses import dataclass, field
-from typing import List, Counter
+from typing import Dict, List, Counter
 
 @dataclass
 class Line:
     """Represents a line of text with font/layout metadata for heading detection."""
     page: int
     text: str
-    font_names: List[str]
-    font_sizes: List[float]
+    font_name: str  # dominant font of the line's words
     x0: float
     x1: float
     top: float
@@ -16,4 +17,157 @@ class Line:
     is_all_caps: bool
     avg_font_size: float
     leading: float
-    indent: float 
\ No newline at end of file
+    indent: float 
+
+@dataclass
+class PageGeometry:
+    """Layout facts about one page, computed once when its lines are extracted."""
+    page: int
+    width: float
+    height: float
+    left: float = 0.0    # leftmost text x0 (left margin)
+    right: float = 0.0   # rightmost text x1
+    columns: List[float] = field(default_factory=list)  # left edge of each text column, ascending
+    x_hist: Dict[int, int] = field(default_factory=dict)  # word-start x0 bin (X_HIST_BIN wide) -> word count
+
+    def column_left(self, x0):
+        """Left edge of the column a line starting at x0 belongs to."""
+        for edge in reversed(self.columns):
+            if x0 >= edge:
+                return edge
+        return self.left
+
+
+FLOAT_COLUMNS = ("x0", "x1", "top", "bottom", "avg_font_size", "leading", "indent", "score")
+INT_COLUMNS = ("page", "font_id", "is_boldish", "is_all_caps")
+ARRAY_COLUMNS = INT_COLUMNS + FLOAT_COLUMNS
+
+
+class LineTable:
+    """Columnar store of Line records: one typed array per numeric field, texts in a list, font names interned to ids."""
+
+    def __init__(self, fonts=None):
+        self.page = array("i")
+        self.font_id = array("i")
+        self.is_boldish = array("b")
+        self.is_all_caps = array("b")
+        for name in FLOAT_COLUMNS:
+            setattr(self, name, array("d"))
+        self.text = []
+        self.fonts = list(fonts) if fonts else []  # font_id -> font name
+        self._font_ids = {f: i for i, f in enumerate(self.fonts)}
+        self.pages = {}  # page number -> PageGeometry
+
+    def __len__(self):
+        return len(self.text)
+
+    def __iter__(self):
+        return (self.row(i) for i in range(len(self)))
+
+    def font_id_for(self, name):
+        fid = self._font_ids.get(name)
+        if fid is None:
+            fid = self._font_ids[name] = len(self.fonts)
+            self.fonts.append(name)
+        return fid
+
+    def append(self, line):
+        """Append one line dict as produced by extract_lines."""
+        self.page.append(line["page"])
+        self.text.append(line["text"])
+        self.font_id.append(self.font_id_for(line["font_name"]))
+        self.is_boldish.append(line["is_boldish"])
+        self.is_all_caps.append(line["is_all_caps"])
+        for name in FLOAT_COLUMNS:
+            getattr(self, name).append(line.get(name, 0.0))
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+        return self
+
+    def row(self, i):
+        """Materialise line i as a dict (for callers that want the old line-dict shape)."""
+        d = {name: getattr(self, name)[i] for name in FLOAT_COLUMNS}
+        d.update(page=self.page[i], text=self.text[i], font_name=self.fonts[self.font_id[i]],
+                 is_boldish=bool(self.is_boldish[i]), is_all_caps=bool(self.is_all_caps[i]))
+        return d
+
+    def take(self, indices):
+        """New table holding the given rows, in the given order."""
+        out = LineTable(self.fonts)
+        for name in ARRAY_COLUMNS:
+            src = getattr(self, name)
+            getattr(out, name).extend(src[i] for i in indices)
+        out.text = [self.text[i] for i in indices]
+        out.pages = self.pages
+        return out
+
+    def move_row(self, src, dst):
+        """Copy row src over row dst, for compacting the table in place."""
+        for name in ARRAY_COLUMNS:
+            col = getattr(self, name)
+            col[dst] = col[src]
+        self.text[dst] = self.text[src]
+
+    def truncate(self, n):
+        """Drop every row from n on."""
+        for name in ARRAY_COLUMNS:
+            del getattr(self, name)[n:]
+        del self.text[n:]
+
+    def to_arrays(self):
+        """The table as a dict of a few numpy arrays (e.g. for np.savez): numeric
+        columns packed into one int and one float block, texts as one UTF-8
+        buffer plus per-line byte lengths, ragged page geometry fields as flat
+        values plus per-page counts."""
+        out = {"ints": np.column_stack([np.asarray(getattr(self, name), dtype=np.int32)
+                                        for name in INT_COLUMNS]).reshape(-1, len(INT_COLUMNS)),
+               "floats": np.column_stack([np.asarray(getattr(self, name))
+                                          for name in FLOAT_COLUMNS]).reshape(-1, len(FLOAT_COLUMNS))}
+        text = [t.encode("utf-8", "surrogatepass") for t in self.text]
+        out["text"] = np.frombuffer(b"".join(text), dtype=np.uint8)
+        out["text_len"] = np.array([len(t) for t in text], dtype=np.int64)
+        out["fonts"] = np.array(self.fonts, dtype=str)
+        geoms = [self.pages[p] for p in sorted(self.pages)]
+        out["geo_page"] = np.array([g.page for g in geoms], dtype=np.int32)
+        out["geo_box"] = np.array([(g.width, g.height, g.left, g.right) for g in geoms], dtype=np.float64).reshape(-1, 4)
+        out["geo_columns"] = np.array([c for g in geoms for c in g.columns], dtype=np.float64)
+        out["geo_columns_len"] = np.array([len(g.columns) for g in geoms], dtype=np.int64)
+        out["geo_hist"] = np.array([kv for g in geoms for kv in g.x_hist.items()], dtype=np.int64).reshape(-1, 2)
+        out["geo_hist_len"] = np.array([len(g.x_hist) for g in geoms], dtype=np.int64)
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of to_arrays; arrays may be any mapping, such as an open NpzFile."""
+        out = cls([str(f) for f in arrays["fonts"]])
+        for block, names in (("ints", INT_COLUMNS), ("floats", FLOAT_COLUMNS)):
+            values = arrays[block]
+            for j, name in enumerate(names):
+                col = getattr(out, name)
+                col.frombytes(values[:, j].astype(np.dtype(col.typecode)).tobytes())
+        buf = arrays["text"].tobytes()
+        ends = np.cumsum(arrays["text_len"]).tolist()
+        out.text = [buf[a:b].decode("utf-8", "surrogatepass") for a, b in zip([0] + ends, ends)]
+        col_ends = np.cumsum(arrays["geo_columns_len"]).tolist()
+        hist_ends = np.cumsum(arrays["geo_hist_len"]).tolist()
+        columns, hist = arrays["geo_columns"].tolist(), arrays["geo_hist"].tolist()
+        c0 = h0 = 0
+        for page, box, c1, h1 in zip(arrays["geo_page"].tolist(), arrays["geo_box"].tolist(), col_ends, hist_ends):
+            out.pages[page] = PageGeometry(page, *box, columns=columns[c0:c1], x_hist=dict(map(tuple, hist[h0:h1])))
+            c0, h0 = c1, h1
+        return out
+
+    @classmethod
+    def concat(cls, tables):
+        """Concatenate tables (e.g. per-shard results), re-interning font ids."""
+        out = cls()
+        for t in tables:
+            remap = [out.font_id_for(f) for f in t.fonts]
+            for name in ("page", "is_boldish", "is_all_caps") + FLOAT_COLUMNS:
+                getattr(out, name).extend(getattr(t, name))
+            out.font_id.extend(remap[fid] for fid in t.font_id)
+            out.text.extend(t.text)
+            out.pages.update(t.pages)
+        return out
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic PDFs for benchmarks: plain-text Type1 pages with known headings.
+
+    python synthpdf.py OUT_DIR        # write the benchmark corpus (PROFILES)
+
+Each document comes with its expected outline, written as truth/<name>.json
+in main.py's output format so replay.py can score against it.
+"""
+import json, random, sys
+from pathlib import Path
+
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN, GUTTER = 612, 792, 72, 24
+FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold", "F3": "Times-Roman", "F4": "Courier", "F5": "Times-Italic"}
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+         "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi").split()
+TITLE = "Synthetic Benchmark Document"
+
+# name -> make_document arguments; keep these stable, the stored benchmark baseline depends on them
+PROFILES = {
+    "memo": dict(pages=1, seed=1),
+    "report": dict(pages=12, seed=2),
+    "dense": dict(pages=6, words_per_line=16, body_size=8, seed=3),
+    "twocol": dict(pages=8, columns=2, words_per_line=6, seed=4),
+    "fonts": dict(pages=6, body_fonts=("F1", "F3", "F4", "F5"), seed=5),
+    "headings": dict(pages=8, heading_density=0.4, seed=6),
+    "sparse": dict(pages=8, heading_density=0.03, running_header=False, seed=7),
+    "book": dict(pages=60, seed=8),
+}
+
+
+def _esc(s):
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages, title=None):
+    """PDF bytes for pages given as lists of (font key, size, x, y, text) runs, y from the page bottom."""
+    objs = [None, None]  # catalog and page tree, filled in once the pages exist
+    def add(body):
+        objs.append(body)
+        return len(objs)
+    fonts = " ".join(f"/{k} {add(f'<< /Type /Font /Subtype /Type1 /BaseFont /{v} >>')} 0 R" for k, v in FONTS.items())
+    page_ids = []
+    for items in pages:
+        ops = ["BT"] + [f"/{font} {size} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm ({_esc(text)}) Tj"
+                        for font, size, x, y, text in items] + ["ET"]
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                            f"/Resources << /Font << {fonts} >> >> /Contents {content} 0 R >>"))
+    objs[0] = "<< /Type /Catalog /Pages 2 0 R >>"
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+    info = add(f"<< /Title ({_esc(title)}) >>") if title else None
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + (body if isinstance(body, bytes) else body.encode("latin-1")) + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    trailer = f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R" + (f" /Info {info} 0 R" if info else "")
+    out += (trailer + f" >>\nstartxref\n{xref}\n%%EOF\n").encode()
+    return bytes(out)
+
+
+def make_document(pages=10, words_per_line=12, heading_density=0.15, columns=1, body_fonts=("F3",),
+                  body_size=10, running_header=True, seed=0):
+    """(page runs for build_pdf, expected result dict) for one synthetic document.
+
+    Page 1 opens with a centred title. Body paragraphs in a randomly chosen
+    body font are interleaved with bold numbered H1 sections (heading_density
+    is the chance a paragraph is preceded by one), half of them followed by an
+    H2 subsection. running_header adds a header and page-number footer to
+    every page."""
+    rng = random.Random(seed)
+    col_width = (PAGE_WIDTH - 2 * MARGIN - GUTTER * (columns - 1)) / columns
+    leading = body_size * 1.3
+    runs, outline = [], []
+    sec = 0
+    for p in range(pages):
+        items = []
+        if running_header:
+            items.append(("F1", 8, MARGIN, PAGE_HEIGHT - 22, "Synthetic Corp - Internal Benchmark Report"))
+            items.append(("F1", 8, PAGE_WIDTH / 2 - 20, 30, f"Page {p + 1} of {pages}"))
+        top = PAGE_HEIGHT - MARGIN
+        if p == 0:
+            items.append(("F2", 24, PAGE_WIDTH / 2 - 12 * len(TITLE) / 2, top, TITLE))
+            top -= 48
+        for c in range(columns):
+            x = MARGIN + c * (col_width + GUTTER)
+            y = top
+            while y > MARGIN + 2 * leading:
+                if rng.random() < heading_density and y > MARGIN + 80:
+                    sec += 1
+                    text = f"{sec}. {' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title()}"
+                    items.append(("F2", 16, x, y, text))
+                    outline.append({"level": "H1", "text": text, "page": p + 1})
+                    y -= 26
+                    if rng.random() < 0.5:
+                        text = f"{sec}.1 {' '.join(rng.choice(WORDS) for _ in range(3)).title()}"
+                        items.append(("F2", 13, x, y, text))
+                        outline.append({"level": "H2", "text": text, "page": p + 1})
+                        y -= 22
+                font = rng.choice(body_fonts)
+                for _ in range(rng.randint(3, 8)):
+                    if y <= MARGIN:
+                        break
+                    items.append((font, body_size, x, y, " ".join(rng.choice(WORDS) for _ in range(words_per_line))))
+                    y -= leading
+                y -= leading / 2
+        runs.append(items)
+    return runs, {"title": TITLE, "outline": outline}
+
+
+def generate_corpus(out_dir, profiles=None):
+    """Write <name>.pdf and truth/<name>.json for each profile; returns the PDF paths.
+
+    Output is byte-for-byte reproducible, so regenerating an existing corpus is harmless."""
+    out_dir = Path(out_dir)
+    (out_dir / "truth").mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, params in (profiles or PROFILES).items():
+        runs, truth = make_document(**params)
+        path = out_dir / f"{name}.pdf"
+        path.write_bytes(build_pdf(runs, title=TITLE if params.get("seed", 0) % 2 else None))
+        (out_dir / "truth" / f"{name}.json").write_text(json.dumps(truth, indent=2), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    for path in generate_corpus(sys.argv[1]):
+        print(path)
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # the pipeline modules live at the repo root
+
+from structures import LineTable, PageGeometry  # noqa: E402
+
+PAGE_WIDTH, PAGE_HEIGHT = 600, 800
+
+
+@pytest.fixture
+def make_table():
+    """Build a LineTable from line dicts (defaults fill in the fields a test does not care about),
+    with a PAGE_WIDTH x PAGE_HEIGHT geometry for every page that has a line."""
+    def make(*lines):
+        table = LineTable()
+        for line in lines:
+            size = line.get("avg_font_size", 10.0)
+            top = line.get("top", 400.0)
+            table.append({"page": 1, "text": "body text", "font_name": "Times-Roman", "x0": 72.0, "x1": 300.0,
+                          "bottom": top + size, "is_boldish": False, "is_all_caps": False, "avg_font_size": size,
+                          "leading": 0.0, "indent": 0.0, **line, "top": top})
+        for page in set(table.page):
+            table.pages[page] = PageGeometry(page, PAGE_WIDTH, PAGE_HEIGHT)
+        return table
+    return make
@@ -0,0 +1,82 @@
+from processor import process_pdf
+
+
+def write_pdf(path, objects):
+    """Write a PDF from {object number: body}; object 1 is the catalog."""
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        body = objects[num]
+        out += b"%d 0 obj\n" % num + (body if isinstance(body, bytes) else body.encode("latin-1")) + b"\nendobj\n"
+    size = max(objects) + 1
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    out += b"".join(b"%010d 00000 n \n" % offsets[n] if n in offsets else b"0000000000 65535 f \n"
+                    for n in range(1, size))
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    path.write_bytes(bytes(out))
+    return path
+
+
+def document(outlines, dests="", outline_root="<< /Type /Outlines /First 11 0 R >>"):
+    """Three pages (objects 3-5) with some text, an outline root (10) and outline entries (11+)."""
+    text = b"BT /F1 20 Tf 72 700 Td (Quarterly Report) Tj /F1 10 Tf 0 -40 Td (Some body text here.) Tj ET"
+    objects = {
+        1: f"<< /Type /Catalog /Pages 2 0 R /Outlines 10 0 R /Names << /Dests << /Names [{dests}] >> >> >>",
+        2: "<< /Type /Pages /Kids [3 0 R 4 0 R 5 0 R] /Count 3 >>",
+        6: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        7: b"<< /Length %d >>\nstream\n" % len(text) + text + b"\nendstream",
+        10: outline_root,
+    }
+    for num in (3, 4, 5):
+        objects[num] = ("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                        "/Resources << /Font << /F1 6 0 R >> >> /Contents 7 0 R >>")
+    objects.update(outlines)
+    return objects
+
+
+def levels(result):
+    return [(e["level"], e["text"], e["page"]) for e in result["outline"]]
+
+
+def test_depth_order_and_destination_kinds(tmp_path):
+    pdf = write_pdf(tmp_path / "outline.pdf", document({
+        11: "<< /Title (Chapter 1) /Dest [3 0 R /Fit] /First 12 0 R /Next 15 0 R >>",
+        12: "<< /Title (Section 1.1) /Dest [3 0 R /XYZ 0 700 0] /First 13 0 R >>",
+        13: "<< /Title (Part 1.1.1) /A << /S /GoTo /D [4 0 R /Fit] >> /First 14 0 R /Next 18 0 R >>",
+        14: "<< /Title (Detail 1.1.1.1) /Dest (intro) >>",  # depth 4, capped to H3
+        18: "<< /Title (Part 1.1.2) /Dest [1 /Fit] >>",  # 0-based page index
+        15: "<< /Title (Chapter 2) /A << /S /GoTo /D (chap2) >> /Next 16 0 R >>",
+        16: "<< /Title (Missing) /Dest (nowhere) /First 17 0 R >>",  # unresolvable: dropped, child kept
+        17: "<< /Title (Appendix  A) /Dest [5 0 R /Fit] >>",
+    }, dests="(chap2) [5 0 R /Fit] (intro) [4 0 R /XYZ 0 792 0]"))
+    result = process_pdf(pdf, use_bookmarks=True)
+    assert levels(result) == [("H1", "Chapter 1", 1), ("H2", "Section 1.1", 1), ("H3", "Part 1.1.1", 2),
+                              ("H3", "Detail 1.1.1.1", 2), ("H3", "Part 1.1.2", 2), ("H1", "Chapter 2", 3),
+                              ("H2", "Appendix A", 3)]
+    assert result["title"] == "Chapter 1"
+
+
+def test_cyclic_outline_terminates(tmp_path):
+    pdf = write_pdf(tmp_path / "cycle.pdf", document({
+        11: "<< /Title (One) /Dest [3 0 R /Fit] /Next 12 0 R >>",
+        12: "<< /Title (Two) /Dest [4 0 R /Fit] /Next 11 0 R /First 12 0 R >>",
+    }))
+    assert levels(process_pdf(pdf, use_bookmarks=True)) == [("H1", "One", 1), ("H1", "Two", 2)]
+
+
+def test_falls_back_to_heuristics_when_no_entry_resolves(tmp_path):
+    pdf = write_pdf(tmp_path / "broken.pdf", document({
+        11: "<< /Title (Gone) /Dest (nowhere) /Next 12 0 R >>",
+        12: "<< /Title (Elsewhere) /A << /S /URI /URI (http://example.com) >> >>",
+    }))
+    assert process_pdf(pdf, use_bookmarks=True) == process_pdf(pdf)
+
+
+def test_without_outlines_uses_heuristics(tmp_path):
+    objects = document({})
+    objects[1] = "<< /Type /Catalog /Pages 2 0 R >>"
+    del objects[10]
+    pdf = write_pdf(tmp_path / "plain.pdf", objects)
+    assert process_pdf(pdf, use_bookmarks=True) == process_pdf(pdf)
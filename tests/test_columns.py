@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+from processor import line_dicts, page_geometry, split_columns
+
+PAGE = SimpleNamespace(width=612, height=792)
+
+
+def word(text, x0, top, width=40.0):
+    return {"text": text, "x0": x0, "x1": x0 + width, "top": top, "bottom": top + 10, "fontname": "Times-Roman",
+            "size": 10.0}
+
+
+def row(top, starts, tag):
+    return [word(f"{tag}{i}", x, top) for i, x in enumerate(starts)]
+
+
+LEFT = (72, 122, 172, 222)     # words end by 262
+RIGHT = (320, 370, 420, 470)   # a 58 pt gutter from 262 to 320
+
+
+def two_column_page(rows=20):
+    return [row(100 + 14 * r, LEFT, f"L{r}.") + row(100 + 14 * r, RIGHT, f"R{r}.") for r in range(rows)]
+
+
+def texts(lines):
+    return [" ".join(w["text"] for w in line) for line in lines]
+
+
+def test_two_column_page_is_split_and_read_column_by_column():
+    lines = two_column_page()
+    geometry = page_geometry(PAGE, 1, lines)
+    assert geometry.columns == [72, 320]
+    out = texts(split_columns(lines, geometry))
+    assert out == ([" ".join(f"L{r}.{i}" for i in range(4)) for r in range(20)]
+                   + [" ".join(f"R{r}.{i}" for i in range(4)) for r in range(20)])
+
+
+def test_full_width_title_across_the_gutter_stays_whole():
+    title = [word(f"T{i}", 72 + 45 * i, 60) for i in range(10)]  # 5 pt gaps, one word straddles the gutter
+    lines = [title] + two_column_page()
+    geometry = page_geometry(PAGE, 1, lines)
+    assert geometry.columns == [72, 320]
+    out = texts(split_columns(lines, geometry))
+    assert out[0] == " ".join(f"T{i}" for i in range(10))
+    assert len(out) == 41
+
+
+def prose_row(top, seed, tag):
+    """Words of varying width 3 pt apart, filling the text block like a line of body text."""
+    words, x, i = [], 72.0, 0
+    while True:
+        width = 12 + (seed * 7 + i * 13) % 37
+        if x + width > 540:
+            return words
+        words.append(word(f"{tag}{i}", x, top, width))
+        x += width + 3
+        i += 1
+
+
+def test_single_column_page_is_unchanged():
+    lines = [prose_row(100 + 14 * r, r, f"P{r}.") for r in range(20)]
+    geometry = page_geometry(PAGE, 1, lines)
+    assert geometry.columns == [min(w["x0"] for line in lines for w in line)]
+    assert split_columns(lines, geometry) is lines
+
+
+def test_right_aligned_numbers_are_not_a_column():
+    # a table of contents: entry text, then the page number near the right margin
+    lines = [row(100 + 14 * r, (72, 122, 172), f"E{r}.") + [word(str(r + 1), 520, 100 + 14 * r, width=12)]
+             for r in range(20)]
+    geometry = page_geometry(PAGE, 1, lines)
+    assert len(geometry.columns) == 1
+    assert split_columns(lines, geometry) is lines
+
+
+def test_indent_is_measured_from_the_lines_own_column():
+    lines = two_column_page()
+    lines.append(row(400, (82, 132), "Lx") + row(400, (335, 385), "Rx"))  # each indented into its column
+    geometry = page_geometry(PAGE, 1, lines)
+    indents = {d["text"]: d["indent"] for d in line_dicts(split_columns(lines, geometry), geometry)}
+    assert indents["Lx0 Lx1"] == 10
+    assert indents["Rx0 Rx1"] == 15
+    assert indents["R0.0 R0.1 R0.2 R0.3"] == 0
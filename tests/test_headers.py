@@ -0,0 +1,40 @@
+from processor import drop_repeating_headers
+
+
+def body(page, i=0):
+    return {"page": page, "text": f"body line {i} on page {page}", "top": 300.0 + 20 * i}
+
+
+def test_digit_masked_footers_are_dropped(make_table):
+    lines = [body(p, i) for p in range(1, 6) for i in range(3)]
+    lines += [{"page": p, "text": f"Page {p} of 5", "top": 770.0} for p in range(1, 6)]
+    kept = drop_repeating_headers(make_table(*lines))
+    assert len(kept) == 15
+    assert not any(t.startswith("Page") for t in kept.text)
+
+
+def test_running_header_is_dropped_despite_small_y_jitter(make_table):
+    lines = [body(p) for p in range(1, 5)]
+    lines += [{"page": p, "text": "Annual Report 2024", "top": 30.0 + (p % 2) * 4} for p in range(1, 5)]
+    kept = drop_repeating_headers(make_table(*lines))
+    assert "Annual Report 2024" not in kept.text
+
+
+def test_fewer_than_three_pages_keeps_everything(make_table):
+    lines = [body(p) for p in (1, 2)] + [{"page": p, "text": "Chapter 1", "top": 30.0} for p in (1, 2)]
+    table = make_table(*lines)
+    assert len(drop_repeating_headers(table)) == len(table)
+
+
+def test_heading_below_min_fraction_is_kept(make_table):
+    # on 3 of 10 pages: at least 3 pages, but under half of them
+    lines = [body(p) for p in range(1, 11)]
+    lines += [{"page": p, "text": "Introduction", "top": 40.0} for p in (2, 5, 8)]
+    kept = drop_repeating_headers(make_table(*lines))
+    assert len(kept) == 13
+    assert drop_repeating_headers(make_table(*lines), min_fraction=0.3).text.count("Introduction") == 0
+
+
+def test_body_text_repeating_mid_page_is_kept(make_table):
+    lines = [{"page": p, "text": "See the appendix.", "top": 400.0} for p in range(1, 6)]
+    assert len(drop_repeating_headers(make_table(*lines))) == 5
@@ -0,0 +1,44 @@
+from processor import assign_levels
+
+H1, H2, H3 = 20.0, 16.0, 13.0
+
+
+def cand(text, size, page=1, top=100.0, **kw):
+    return {"text": text, "avg_font_size": size, "page": page, "top": top, **kw}
+
+
+def levels(outline):
+    return [(e["level"], e["text"]) for e in outline]
+
+
+def test_h3_directly_under_h1_is_demoted_to_h2(make_table):
+    cands = make_table(cand("Intro", H1, top=100), cand("Scope", H3, top=200), cand("Detail", H3, top=300),
+                       cand("Small print", H2, page=2))
+    assert levels(assign_levels(cands)) == [("H1", "Intro"), ("H2", "Scope"), ("H3", "Detail"),
+                                            ("H2", "Small print")]
+
+
+def test_h3_needs_an_h2_under_the_current_h1(make_table):
+    # an H2 under an earlier H1 no longer licenses an H3 after a new H1
+    cands = make_table(cand("One", H1, top=100), cand("One A", H2, top=200),
+                       cand("Two", H1, page=2), cand("Two A", H3, page=2, top=200))
+    assert levels(assign_levels(cands)) == [("H1", "One"), ("H2", "One A"), ("H1", "Two"), ("H2", "Two A")]
+
+
+def test_duplicate_text_page_and_top_are_dropped(make_table):
+    cands = make_table(cand("Results", H1, top=100.2), cand("Results", H1, top=99.8),
+                       cand("Results", H1, top=400), cand("Results", H1, page=2, top=100))
+    assert [(e["text"], e["page"]) for e in assign_levels(cands)] == [("Results", 1), ("Results", 1), ("Results", 2)]
+
+
+def test_outline_always_has_an_h1(make_table):
+    # Indents push levels down, but the largest candidate size always maps
+    # to H1, so the first-entry promotion is only a guard: either way the
+    # outline must contain an H1
+    cands = make_table(cand("2.1 Setup", H2, top=100, indent=20.0), cand("2.1.1 Tools", H3, top=200, indent=30.0))
+    assert levels(assign_levels(cands)) == [("H1", "2.1 Setup"), ("H2", "2.1.1 Tools")]
+
+
+def test_no_candidates():
+    from structures import LineTable
+    assert assign_levels(LineTable()) == []
@@ -0,0 +1,41 @@
+from processor import merge_wrapped_heading_lines
+
+
+def body_lines(page=1, n=6, top=300.0):
+    return [{"page": page, "text": f"body line {i}", "top": top + 13 * i} for i in range(n)]
+
+
+def heading(text, top, **kw):
+    return {"text": text, "top": top, "font_name": "Helvetica-Bold", "is_boldish": True, "avg_font_size": 16.0,
+            "x0": 72.0, "x1": 400.0, **kw}
+
+
+def test_two_line_bold_heading_is_merged(make_table):
+    table = make_table(heading("2. A Heading Long Enough", 100.0), heading("To Wrap Onto Two Lines", 118.0,
+                                                                           x1=350.0),
+                       *body_lines())
+    merged = merge_wrapped_heading_lines(table)
+    assert len(merged) == 7
+    assert merged.text[0] == "2. A Heading Long Enough To Wrap Onto Two Lines"
+    assert merged.bottom[0] == 134.0
+    assert merged.x1[0] == 400.0
+    assert merged.text[1:] == [f"body line {i}" for i in range(6)]
+
+
+def test_centred_heading_lines_are_merged(make_table):
+    table = make_table(heading("A Centred", 100.0, x0=250.0, x1=350.0),
+                       heading("Two-Line Title", 118.0, x0=220.0, x1=380.0), *body_lines())
+    assert merge_wrapped_heading_lines(table).text[0] == "A Centred Two-Line Title"
+
+
+def test_body_lines_are_not_merged(make_table):
+    table = make_table(*body_lines(n=8))
+    assert len(merge_wrapped_heading_lines(table)) == 8
+
+
+def test_headings_far_apart_or_on_other_pages_are_not_merged(make_table):
+    table = make_table(heading("1. First", 100.0), heading("2. Second", 200.0),
+                       heading("3. Third", 760.0), heading("Continued", 100.0, page=2),
+                       *body_lines(), *body_lines(page=2))
+    merged = merge_wrapped_heading_lines(table)
+    assert merged.text[:4] == ["1. First", "2. Second", "3. Third", "Continued"]
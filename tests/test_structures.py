@@ -0,0 +1,45 @@
+import io
+import numpy as np
+from structures import ARRAY_COLUMNS, LineTable, PageGeometry
+
+
+def round_trip(table):
+    buf = io.BytesIO()
+    np.savez(buf, **table.to_arrays())  # the way cache.FeatureCache stores tables
+    buf.seek(0)
+    with np.load(buf) as arrays:
+        return LineTable.from_arrays(arrays)
+
+
+def assert_same(a, b):
+    for name in ARRAY_COLUMNS:
+        assert getattr(a, name) == getattr(b, name), name
+    assert a.text == b.text
+    assert a.fonts == b.fonts
+    assert a.pages == b.pages
+
+
+def test_round_trip(make_table):
+    table = make_table({"text": "1. Überblick — ©", "font_name": "Helvetica-Bold", "is_boldish": True,
+                        "avg_font_size": 14.0, "top": 90.5, "score": 0.5},
+                       {"text": "", "indent": -3.25, "score": -1.0},
+                       {"page": 2, "text": "第一章 概要", "is_all_caps": True, "x0": 330.0, "score": 2.25})
+    table.pages[1].columns = [72.0]
+    table.pages[2] = PageGeometry(2, 612.0, 792.0, left=72.0, right=540.0, columns=[72.0, 330.0],
+                                  x_hist={14: 40, 66: 38})
+    table.pages[3] = PageGeometry(3, 612.0, 792.0)  # a page with no text
+    out = round_trip(table)
+    assert_same(out, table)
+    assert out.row(0)["font_name"] == "Helvetica-Bold"
+
+
+def test_round_trip_empty_table():
+    out = round_trip(LineTable())
+    assert len(out) == 0
+    assert_same(out, LineTable())
+
+
+def test_round_trip_pages_without_lines():
+    table = LineTable()
+    table.pages[1] = PageGeometry(1, 612.0, 792.0)
+    assert round_trip(table).pages == table.pages
@@ -0,0 +1,94 @@
+import math, statistics
+import numpy as np
+import pytest
+from thresholds import (ScoreSketch, compute_threshold, mean_std_threshold, otsu_threshold, percentile_threshold,
+                        select_candidates, top_indices)
+
+
+def scores(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.round(rng.normal(0.5, 0.8, n), 3)
+
+
+def bimodal(seed=0):
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.normal(0.0, 0.2, 900), rng.normal(3.0, 0.2, 100)])
+
+
+def sketch(values, chunk=97):
+    s = ScoreSketch()
+    for i in range(0, len(values), chunk):
+        s.update(values[i:i + chunk])
+    return s
+
+
+def test_equal_scores_keep_every_line():
+    equal = [0.2 + 0.5] * 7  # np.mean of these rounds up to 0.7000000000000002
+    assert mean_std_threshold(equal) == equal[0]
+    assert sketch(equal, chunk=3).threshold() == equal[0]
+    assert select_candidates(equal).tolist() == list(range(7))
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("k", [0.5, 1.0, 2.0])
+def test_mean_std_matches_statistics_rule(seed, k):
+    values = scores(seed=seed)
+    expected = statistics.mean(values.tolist()) + k * statistics.stdev(values.tolist())
+    assert mean_std_threshold(values, k) == pytest.approx(expected, rel=1e-12)
+    assert select_candidates(values, k=k).tolist() == [i for i, v in enumerate(values) if v >= expected]
+
+
+def test_empty_and_single_score():
+    for strategy in ("mean_std", "percentile", "otsu"):
+        assert compute_threshold([], strategy) == 0
+        assert select_candidates([], strategy).tolist() == []
+        assert select_candidates([1.5], strategy).tolist() == [0]
+
+
+def test_sketch_in_chunks_matches_array_mean_std():
+    values = scores()
+    assert sketch(values).threshold("mean_std", k=1.0) == pytest.approx(mean_std_threshold(values, 1.0), rel=1e-12)
+
+
+@pytest.mark.parametrize("top", [0.01, 0.1, 0.25])
+def test_sketch_in_chunks_matches_array_percentile_to_a_bin(top):
+    values = scores()
+    s = sketch(values)
+    cut, exact = s.threshold("percentile", top=top), percentile_threshold(values, top)
+    assert exact - s.bin_width < cut <= exact  # a bin's lower edge: keeps at least the top fraction
+    assert (values >= cut).sum() >= math.ceil(top * len(values))
+
+
+def test_sketch_in_chunks_matches_array_otsu():
+    values = bimodal()
+    s = sketch(values)
+    assert (values >= s.threshold("otsu")).sum() == (values >= otsu_threshold(values)).sum() == 100
+
+
+def test_sketch_merge_is_order_independent():
+    values = scores()
+    a, b = sketch(values[:700]), sketch(values[700:])
+    merged = ScoreSketch().merge(b).merge(a)
+    whole = sketch(values, chunk=len(values))
+    assert merged.hist == whole.hist and merged.n == whole.n
+    assert merged.threshold() == pytest.approx(whole.threshold(), rel=1e-12)
+
+
+@pytest.mark.parametrize("top", [0.001, 0.1, 0.2, 0.5, 1.0])
+def test_percentile_keeps_exactly_the_top_fraction(top):
+    values = scores()
+    rows = select_candidates(values, "percentile", top=top)
+    assert len(rows) == max(1, math.ceil(top * len(values)))
+    assert rows.tolist() == sorted(rows.tolist())
+    kept = values[rows]
+    assert kept.min() >= np.delete(values, rows).max(initial=-np.inf)
+
+
+def test_percentile_ties_at_the_cut_go_to_the_earliest_lines():
+    # 455 lines share the score at the cut, as on the synthetic book.pdf
+    values = np.array([0.0] * 1000 + [1.0] * 455 + [2.0] * 100)
+    for top in (0.1, 0.2):
+        rows = top_indices(values, top)
+        want = math.ceil(top * len(values))
+        assert len(rows) == want
+        assert rows.tolist() == list(range(1000, 1000 + want - 100)) + list(range(1455, 1555))
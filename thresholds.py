@@ -0,0 +1,157 @@
+import math
+import numpy as np
+
+STRATEGIES = ("mean_std", "percentile", "otsu")
+
+
+def _mean_std(scores):
+    """(mean, sample stdev) of a non-empty score array, exactly (score, 0) when all
+    scores are equal: np.mean can round above them and leave none at the cut."""
+    lo, hi = scores.min(), scores.max()
+    if lo == hi:
+        return float(lo), 0.0
+    return float(scores.mean()), float(scores.std(ddof=1))
+
+
+def mean_std_threshold(scores, k=1.0):
+    """mean + k * sample stdev of the scores."""
+    scores = np.asarray(scores, dtype=float)
+    if not len(scores):
+        return 0
+    mean, stdev = _mean_std(scores)
+    return mean + k * stdev
+
+
+def percentile_threshold(scores, top=0.1):
+    """Score of the ceil(top * n)-th best line, found by quickselect (np.partition) in O(n)."""
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    if not n:
+        return 0
+    kth = n - min(n, max(1, math.ceil(top * n)))
+    return np.partition(scores, kth)[kth]
+
+
+def top_indices(scores, top=0.1):
+    """Ascending indices of exactly the ceil(top * n) best scores (at least one); of
+    lines tied at the cut, the earliest are kept."""
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    if not n:
+        return np.empty(0, dtype=np.intp)
+    want = min(n, max(1, math.ceil(top * n)))
+    cut = percentile_threshold(scores, top)
+    keep = scores > cut
+    keep[np.flatnonzero(scores == cut)[:want - int(keep.sum())]] = True
+    return np.flatnonzero(keep)
+
+
+def otsu_threshold(scores, bins=256):
+    """Otsu's split of the score histogram: the cut maximising between-class variance."""
+    scores = np.asarray(scores, dtype=float)
+    if not len(scores):
+        return 0
+    counts, edges = np.histogram(scores, bins=bins)
+    return _otsu(counts, (edges[:-1] + edges[1:]) / 2, edges)
+
+
+def _otsu(counts, centers, edges):
+    """Upper edge of the best split bin; edges has len(counts) + 1 entries."""
+    counts = np.asarray(counts, dtype=float)
+    w0 = np.cumsum(counts)
+    w1 = w0[-1] - w0
+    s0 = np.cumsum(counts * centers)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mu0 = s0 / w0
+        mu1 = (s0[-1] - s0) / w1
+        between = w0 * w1 * (mu0 - mu1) ** 2
+    between[~np.isfinite(between)] = -1
+    if between.max() < 0:  # all scores in one bin: keep them all, like mean_std would
+        return edges[0]
+    return edges[int(np.argmax(between)) + 1]
+
+
+class ScoreSketch:
+    """Mergeable streaming summary of a score stream.
+
+    Keeps exact count/mean/variance (Chan's parallel update) and a sparse
+    fixed-width histogram, so mean_std cut-offs are exact and percentile and
+    Otsu cut-offs are accurate to bin_width, in memory independent of the
+    number of lines. Being a cut rather than a row selection, the percentile
+    cut (a bin's lower edge) keeps at least, not exactly, the top fraction
+    when used as scores >= cut: ties and the rest of the cut's bin come too.
+    Use select_candidates on the full scores to honour top exactly."""
+
+    def __init__(self, bin_width=0.05):
+        self.bin_width = bin_width
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.hist = {}  # bin index -> count
+
+    def update(self, scores):
+        scores = np.asarray(scores, dtype=float)
+        if not len(scores):
+            return self
+        other = ScoreSketch(self.bin_width)
+        other.n = len(scores)
+        other.mean = _mean_std(scores)[0]
+        other.m2 = float(((scores - other.mean) ** 2).sum())
+        idx, counts = np.unique(np.floor(scores / self.bin_width).astype(np.int64), return_counts=True)
+        other.hist = dict(zip(idx.tolist(), counts.tolist()))
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.bin_width != self.bin_width:
+            raise ValueError("Cannot merge score sketches with different bin widths")
+        n = self.n + other.n
+        if n:
+            delta = other.mean - self.mean
+            self.mean += delta * other.n / n
+            self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        for b, c in other.hist.items():
+            self.hist[b] = self.hist.get(b, 0) + c
+        return self
+
+    def threshold(self, strategy="mean_std", k=1.0, top=0.1):
+        if not self.n:
+            return 0
+        if strategy == "mean_std":
+            stdev = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0
+            return self.mean + k * stdev
+        keys = sorted(self.hist)
+        counts = np.array([self.hist[b] for b in keys], dtype=float)
+        lower_edges = np.array(keys, dtype=float) * self.bin_width
+        if strategy == "percentile":
+            want = min(self.n, max(1, math.ceil(top * self.n)))
+            from_top = np.cumsum(counts[::-1])
+            i = len(keys) - 1 - int(np.searchsorted(from_top, want))
+            return lower_edges[i]
+        if strategy == "otsu":
+            return _otsu(counts, lower_edges + self.bin_width / 2,
+                         np.append(lower_edges, lower_edges[-1] + self.bin_width))
+        raise ValueError(f"Unknown threshold strategy: {strategy}")
+
+
+def select_candidates(scores, strategy="mean_std", k=1.0, top=0.1):
+    """Ascending indices of the heading candidates among scores: exactly the best
+    ceil(top * n) for "percentile" (see top_indices), otherwise every score >= the
+    strategy's compute_threshold cut."""
+    scores = np.asarray(scores, dtype=float)
+    if strategy == "percentile":
+        return top_indices(scores, top)
+    return np.flatnonzero(scores >= compute_threshold(scores, strategy, k=k, top=top))
+
+
+def compute_threshold(scores, strategy="mean_std", k=1.0, top=0.1):
+    """Cut-off for heading candidates; scores may be an array or a ScoreSketch."""
+    if isinstance(scores, ScoreSketch):
+        return scores.threshold(strategy, k=k, top=top)
+    if strategy == "mean_std":
+        return mean_std_threshold(scores, k)
+    if strategy == "percentile":
+        return percentile_threshold(scores, top)
+    if strategy == "otsu":
+        return otsu_threshold(scores)
+    raise ValueError(f"Unknown threshold strategy: {strategy}")
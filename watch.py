@@ -0,0 +1,100 @@
+"""Directory watching for main.py --watch: inotify through ctypes on Linux, polling elsewhere."""
+import ctypes, ctypes.util, os, select, struct, sys, time
+from pathlib import Path
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len of the NUL-padded name that follows
+
+
+def _is_pdf(path):
+    return path.suffix.lower() == ".pdf" and not path.name.startswith(".")
+
+
+def scan_pdfs(directory):
+    return sorted(p for p in Path(directory).iterdir() if _is_pdf(p) and p.is_file())
+
+
+def watch_pdfs(directory, interval=1.0, poll=False):
+    """Yield PDFs in directory as they finish landing, starting with those already there.
+
+    Runs forever, and yields None after each interval without news so the
+    caller can do periodic work. Uses inotify (files closed after writing
+    or renamed into place) when available, otherwise or with poll=True
+    rescans every interval and yields files whose size and mtime held
+    still across two scans. A file is yielded again when it is replaced."""
+    fd = None if poll else _inotify_watch(directory)
+    if fd is None:
+        yield from _poll(directory, interval)
+        return
+    try:
+        yield from scan_pdfs(directory)
+        yield from _inotify_events(fd, directory, interval)
+    finally:
+        os.close(fd)
+
+
+def _inotify_watch(directory):
+    """inotify fd watching directory, or None when inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _inotify_events(fd, directory, interval):
+    directory = Path(directory)
+    while True:
+        if not select.select([fd], [], [], interval)[0]:
+            yield None
+            continue
+        try:
+            data = os.read(fd, 1 << 16)
+        except BlockingIOError:
+            continue
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_IGNORED:
+                raise FileNotFoundError(f"watched directory went away: {directory}")
+            if mask & IN_Q_OVERFLOW:  # events were lost; fall back to what is on disk
+                yield from scan_pdfs(directory)
+                continue
+            path = directory / os.fsdecode(name)
+            if _is_pdf(path):
+                yield path
+
+
+def _poll(directory, interval):
+    done = {}  # path -> (size, mtime) when last yielded
+    last = {}
+    while True:
+        current = {}
+        for path in scan_pdfs(directory):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            current[path] = (st.st_size, st.st_mtime_ns)
+        for path, sig in current.items():
+            if done.get(path) != sig and last.get(path) == sig:
+                done[path] = sig
+                yield path
+        for path in done.keys() - current.keys():
+            del done[path]
+        last = current
+        yield None
+        time.sleep(interval)